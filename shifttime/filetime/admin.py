@@ -1,44 +1,288 @@
 from django.contrib import admin
-from .models import FileTime, Lesson, Schedule, ScheduleLesson
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import (
+    FileTime, Group, ImportJob, Lesson, Schedule, ScheduleLesson, TimetableEntry,
+    enqueue_import,
+)
 
-class ScheduleLessonInline(admin.TabularInline):
+METRIC_LABELS = (
+    ('total_s', "Всего, с"),
+    ('open_s', "Открытие файла, с"),
+    ('cache_s', "Кэш разбора, с"),
+    ('load_s', "load_workbook, с"),
+    ('header_s', "Шапка, с"),
+    ('merged_s', "Объединения, с"),
+    ('rows_s', "Чтение строк, с"),
+    ('regex_s', "Разбор ячеек, с"),
+    ('save_s', "Запись, с"),
+    ('conflicts_s', "Поиск конфликтов, с"),
+    ('snapshot_s', "Снимок для API, с"),
+    ('db_s', "Запросы к базе, с"),
+    ('queries', "Запросов"),
+    ('rows', "Строк"),
+    ('cells', "Ячеек"),
+    ('merged_ranges', "Объединений"),
+    ('pairs', "Пар"),
+    ('peak_memory_kb', "Пик памяти, КБ"),
+    ('peak_rss_kb', "Пик RSS процесса, КБ"),
+)
+
+
+def metrics_table(job):
+    rows = [(label, job.metrics[key]) for key, label in METRIC_LABELS if key in job.metrics]
+    if not rows:
+        return '-'
+    return format_html_join('', '<div>{}: {}</div>', rows)
+
+
+CONFLICT_LABELS = {
+    'teacher': "Преподаватель",
+    'room': "Кабинет",
+    'group': "Группа",
+}
+
+
+def conflicts_table(job):
+    rows = [
+        (CONFLICT_LABELS.get(item['kind'], item['kind']), item['key'], item['date'],
+         item['lesson_num'], "; ".join(item['lessons']))
+        for item in job.conflicts
+    ]
+    if not rows:
+        return '-'
+    hidden = job.conflict_count - len(rows)
+    table = format_html_join('', '<div>{} {}: {}, пара {} — {}</div>', rows)
+    if hidden > 0:
+        table += format_html('<div>и еще {}</div>', hidden)
+    return table
+
+
+def count_subquery(queryset, field):
+    # число связанных строк одним подзапросом, без join-а по всем строкам
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(
+        Subquery(counted.annotate(count=Count('pk')).values('count'), output_field=IntegerField()),
+        0,
+    )
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    per_page = 50
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+        return self.page.object_list
+
+
+class ReadOnlyAdminMixin:
+    # пары, дни, предметы и группы - копия загруженных файлов: их читают API, выгрузка,
+    # поиск и снимок через TimetableEntry, поэтому правка идет через исправленный файл
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class PaginatedTabularInline(ReadOnlyAdminMixin, admin.TabularInline):
+    # только чтение и постранично: форма родителя не грузит тысячи строк
+    formset = PaginatedInlineFormSet
+    template = 'admin/filetime/paginated_tabular.html'
+    extra = 0
+    can_delete = False
+    per_page = 50
+    page_param = 'page'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_number = request.GET.get(self.page_param)
+        return formset
+
+
+def group_names(obj):
+    # группы берутся из prefetch_related('groups'), без запроса на строку
+    return ", ".join(group.name for group in obj.groups.all())
+group_names.short_description = "Группы"
+
+
+class ScheduleLessonInline(PaginatedTabularInline):
     model = ScheduleLesson
-    extra = 1 
-    ordering = ('order',)
-    fields = ('lesson', 'order')
+    ordering = ('order', 'pk')
+    fields = ('lesson', group_names, 'order')
+    readonly_fields = (group_names,)
+    page_param = 'lessons_page'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('lesson').prefetch_related('groups')
 
-class ScheduleAdmin(admin.ModelAdmin):
-    list_display = ('day',)
-    list_filter = ('day',)
+
+class ScheduleAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('day', 'lesson_count')
+    date_hierarchy = 'day'
     search_fields = ('day',)
     inlines = [ScheduleLessonInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            lesson_count=count_subquery(ScheduleLesson.objects, 'schedule')
+        )
+
+    def lesson_count(self, obj):
+        return obj.lesson_count
+    lesson_count.short_description = "Пар"
+    lesson_count.admin_order_field = 'lesson_count'
+
 
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'teacher', 'room')
     list_filter = ('teacher',)
+    ordering = ('name', 'teacher')
     search_fields = ('name', 'teacher', 'room')
 
 
+class ImportJobInline(PaginatedTabularInline):
+    model = ImportJob
+    fields = (
+        'status', 'incremental', 'created_at', 'started_at', 'finished_at', 'duration',
+        'rows_inserted', 'rows_updated', 'rows_deleted', 'conflict_count', 'import_metrics', 'error',
+    )
+    readonly_fields = fields
+    per_page = 10
+    page_param = 'jobs_page'
+
+    def import_metrics(self, obj):
+        return metrics_table(obj)
+    import_metrics.short_description = "Метрики"
+
+
 class FileTimeAdmin(admin.ModelAdmin):
-    list_display = ('start_date', 'end_date', 'file')
-    list_filter = ('start_date', 'end_date')
+    list_display = (
+        'start_date', 'end_date', 'file', 'schedule_count', 'lesson_count',
+        'import_status', 'import_time', 'import_conflicts',
+    )
+    date_hierarchy = 'start_date'
     search_fields = ('start_date', 'end_date')
-    fields = ('start_date', 'end_date', 'file', 'schedules')
+    fields = ('start_date', 'end_date', 'file', 'schedule_link')
+    # дни создает импорт файла, здесь только ссылка на них
+    readonly_fields = ('schedule_link',)
+    inlines = [ImportJobInline]
+    actions = ['reimport']
+
+    def get_queryset(self, request):
+        latest_job = ImportJob.objects.filter(filetime=OuterRef('pk')).order_by('-created_at', '-pk')
+        return super().get_queryset(request).annotate(
+            latest_import_status=Subquery(latest_job.values('status')[:1]),
+            latest_import_metrics=Subquery(latest_job.values('metrics')[:1]),
+            latest_import_conflicts=Subquery(latest_job.values('conflict_count')[:1]),
+            schedule_count=count_subquery(FileTime.schedules.through.objects, 'filetime'),
+            lesson_count=count_subquery(TimetableEntry.objects, 'filetime'),
+        )
+
+    def schedule_count(self, obj):
+        return obj.schedule_count
+    schedule_count.short_description = "Дней"
+    schedule_count.admin_order_field = 'schedule_count'
+
+    def lesson_count(self, obj):
+        return obj.lesson_count
+    lesson_count.short_description = "Пар"
+    lesson_count.admin_order_field = 'lesson_count'
+
+    def schedule_link(self, obj):
+        if obj is None or obj.pk is None:
+            return '-'
+        url = reverse('admin:filetime_schedule_changelist')
+        return format_html(
+            '<a href="{}?filetime__id__exact={}">Дней: {}</a>', url, obj.pk, obj.schedule_count
+        )
+    schedule_link.short_description = "Расписание"
+
+    def import_status(self, obj):
+        return dict(ImportJob.STATUS_CHOICES).get(obj.latest_import_status, '-')
+    import_status.short_description = "Импорт"
+
+    def import_time(self, obj):
+        total = (obj.latest_import_metrics or {}).get('total_s')
+        return '-' if total is None else f"{total:.2f} c"
+    import_time.short_description = "Время импорта"
+
+    def import_conflicts(self, obj):
+        return '-' if obj.latest_import_conflicts is None else obj.latest_import_conflicts
+    import_conflicts.short_description = "Конфликтов"
+
+    @admin.action(description="Переимпортировать изменения из файла")
+    def reimport(self, request, queryset):
+        for filetime in queryset:
+            enqueue_import(filetime, incremental=True)
+
+
+class GroupAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+class ScheduleLessonAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('schedule', 'lesson', group_names, 'order')
+    list_filter = ('order',)
+    list_select_related = ('schedule', 'lesson')
+    date_hierarchy = 'schedule__day'
+    search_fields = ('schedule__day', 'groups__name', 'lesson__name')
+    # COUNT(*) по всей таблице на каждой странице не нужен
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('groups')
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'filetime', 'status', 'incremental', 'created_at', 'duration',
+        'rows_inserted', 'rows_updated', 'rows_deleted', 'conflict_count',
+    )
+    list_filter = ('status', 'incremental')
+    list_select_related = ('filetime',)
+    exclude = ('metrics', 'conflicts')
+    readonly_fields = (
+        'filetime', 'incremental', 'created_at', 'started_at', 'finished_at',
+        'rows_inserted', 'rows_updated', 'rows_deleted', 'conflict_count', 'import_conflicts',
+        'import_metrics', 'error',
+    )
+    actions = ['requeue']
+
+    def has_add_permission(self, request, obj=None):
+        # задачи создает загрузка файла, у ручной нет ни файла, ни результата
+        return False
 
-    def get_schedules(self, obj):
-        return ", ".join(str(schedule.day) for schedule in obj.schedules.all())
-    get_schedules.short_description = "Расписания"
+    def import_metrics(self, obj):
+        return metrics_table(obj)
+    import_metrics.short_description = "Метрики"
 
+    def import_conflicts(self, obj):
+        return conflicts_table(obj)
+    import_conflicts.short_description = "Конфликты"
 
-class ScheduleLessonAdmin(admin.ModelAdmin):
-    list_display = ('schedule', 'lesson', 'group', 'order')
-    list_filter = ('schedule', 'group', 'order')
-    search_fields = ('schedule__day', 'group', 'lesson__name')
+    @admin.action(description="Повторить импорт с ошибкой")
+    def requeue(self, request, queryset):
+        queryset.filter(status=ImportJob.FAILED).update(
+            status=ImportJob.PENDING, started_at=None, finished_at=None, error=''
+        )
 
 
 admin.site.register(Lesson, LessonAdmin)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Schedule, ScheduleAdmin)
 admin.site.register(FileTime, FileTimeAdmin)
 admin.site.register(ScheduleLesson, ScheduleLessonAdmin)
+admin.site.register(ImportJob, ImportJobAdmin)
@@ -0,0 +1,61 @@
+"""
+Разбор большой книги движками openpyxl (полный и read_only) и native.
+
+Запуск из каталога shifttime:
+    python -m filetime.benchmarks.engines --groups 120 --weeks 8
+"""
+import argparse
+import time
+
+from filetime.benchmarks.generator import generate_workbook
+from filetime.utils.timeparser import ScheduleParser
+
+
+VARIANTS = (
+    ("openpyxl", {"read_only": False}),
+    ("openpyxl read_only", {"read_only": True}),
+    ("native", {"engine": "native"}),
+)
+
+
+def run(stream, options, repeat):
+    best, pairs = None, None
+    for _ in range(repeat):
+        stream.seek(0)
+        started = time.perf_counter()
+        parser = ScheduleParser(stream, **options)
+        pairs = list(parser.iter_pairs())
+        parser.close()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pairs, parser.stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--groups", type=int, default=120)
+    arg_parser.add_argument("--weeks", type=int, default=8)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    stream = generate_workbook(groups=args.groups, weeks=args.weeks)
+    print(f"групп: {args.groups}, недель: {args.weeks}, файл: {len(stream.getvalue()) / 1024:.0f} КБ")
+
+    results = {}
+    for name, options in VARIANTS:
+        results[name] = run(stream, options, args.repeat)
+
+    reference = results["openpyxl"][1]
+    for name, (elapsed, pairs, stats) in results.items():
+        if pairs != reference:
+            raise SystemExit(f"{name}: результат отличается от openpyxl")
+        print(
+            f"{name:<20} {elapsed:.3f} c  (load {stats['load_s']:.3f}, "
+            f"строки {stats['rows_s']:.3f}, объединения {stats['merged_s']:.3f})"
+        )
+    print(f"пар: {len(reference)}, native быстрее read_only в "
+          f"x{results['openpyxl read_only'][0] / results['native'][0]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
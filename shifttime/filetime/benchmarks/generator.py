@@ -0,0 +1,130 @@
+"""
+Генератор синтетических книг расписания для тестов и бенчмарков.
+
+Раскладка как у настоящих файлов: строка 2 - шапка с группами, колонка A -
+дата, объединенная на все пары дня, колонка B - номер пары, дальше ячейки
+"Предмет Фамилия И.О. каб. N" по группам.
+"""
+import random
+from datetime import date, timedelta
+from io import BytesIO
+
+from openpyxl import Workbook
+
+
+SUBJECTS = [
+    "Математика", "Физика", "Информатика", "История", "Английский язык",
+    "Русский язык", "Литература", "Химия", "Биология", "Физическая культура",
+    "Экономика", "Право", "Философия", "Основы программирования",
+    "Базы данных", "Компьютерные сети", "Операционные системы", "Электротехника",
+    "Инженерная графика", "Метрология",
+]
+SURNAMES = [
+    "Иванов", "Петров", "Сидорова", "Кузнецов", "Смирнова", "Попов", "Волкова",
+    "Соколов", "Лебедева", "Козлов", "Новикова", "Морозов", "Фёдоров", "Орлова",
+    "Алексеев", "Макарова", "Зайцев", "Ёлкина", "Павлов", "Семенова",
+]
+INITIALS = "АБВГДЕИКЛМНОПРСТ"
+ROOM_FORMATS = ["каб. {}", "каб.{}", "кабинет {}", "Каб. {} (лаб.)", "цок", ""]
+
+
+def make_teachers(count, rnd):
+    teachers = []
+    for index in range(count):
+        surname = SURNAMES[index % len(SURNAMES)]
+        first, middle = rnd.choice(INITIALS), rnd.choice(INITIALS)
+        teachers.append(f"{surname} {first}.{middle}.")
+    return teachers
+
+
+def make_lesson_text(rnd, subjects, teachers):
+    room = rnd.choice(ROOM_FORMATS).format(rnd.randint(100, 450))
+    return f"{rnd.choice(subjects)} {rnd.choice(teachers)} {room}".strip()
+
+
+def fill_sheet(
+    ws, rnd, groups, weeks, start, days_per_week, lessons_per_day,
+    merged_density, multi_group_ratio, empty_ratio, subjects, teachers,
+    group_prefix,
+):
+    ws.cell(row=1, column=1, value=f"Расписание {group_prefix}")
+    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=2 + groups)
+    ws.cell(row=2, column=1, value="Дата")
+    ws.cell(row=2, column=2, value="Пара")
+
+    number = 1
+    for col in range(3, 3 + groups):
+        if rnd.random() < multi_group_ratio:
+            # одна колонка на две подгруппы: группы через перевод строки
+            header = f"{group_prefix}-{number}\n{group_prefix}-{number + 1}"
+            number += 2
+        else:
+            header = f"{group_prefix}-{number}"
+            number += 1
+        ws.cell(row=2, column=col, value=header)
+
+    row = 3
+    for week in range(weeks):
+        for weekday in range(days_per_week):
+            day = start + timedelta(weeks=week, days=weekday)
+            ws.cell(row=row, column=1, value=day.strftime("%d.%m.%Y"))
+            ws.merge_cells(
+                start_row=row, start_column=1,
+                end_row=row + lessons_per_day - 1, end_column=1,
+            )
+            for lesson_num in range(1, lessons_per_day + 1):
+                ws.cell(row=row, column=2, value=lesson_num)
+                col = 3
+                while col < 3 + groups:
+                    if rnd.random() < empty_ratio:
+                        col += 1
+                        continue
+                    ws.cell(
+                        row=row, column=col,
+                        value=make_lesson_text(rnd, subjects, teachers),
+                    )
+                    span = 1
+                    if rnd.random() < merged_density:
+                        # лекция на поток: объединение на 2-3 соседние группы
+                        span = min(rnd.randint(2, 3), 3 + groups - col)
+                    if span > 1:
+                        ws.merge_cells(
+                            start_row=row, start_column=col,
+                            end_row=row, end_column=col + span - 1,
+                        )
+                    col += span
+                row += 1
+
+
+def generate_workbook(
+    groups=20,
+    weeks=1,
+    sheets=1,
+    start=date(2025, 2, 3),
+    days_per_week=6,
+    lessons_per_day=6,
+    merged_density=0.3,
+    multi_group_ratio=0.1,
+    empty_ratio=0.2,
+    subject_count=20,
+    teacher_count=40,
+    seed=0,
+):
+    rnd = random.Random(seed)
+    subjects = SUBJECTS[:subject_count]
+    teachers = make_teachers(teacher_count, rnd)
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    for number in range(sheets):
+        ws = wb.create_sheet(f"Лист {number + 1}")
+        fill_sheet(
+            ws, rnd, groups, weeks, start, days_per_week, lessons_per_day,
+            merged_density, multi_group_ratio, empty_ratio, subjects, teachers,
+            group_prefix=f"ГР{number + 1}" if sheets > 1 else "ИС",
+        )
+
+    stream = BytesIO()
+    wb.save(stream)
+    stream.seek(0)
+    return stream
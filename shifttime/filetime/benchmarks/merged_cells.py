@@ -0,0 +1,107 @@
+"""
+Сравнение поиска значений объединенных ячеек: индекс против перебора диапазонов.
+
+Запуск из каталога shifttime:
+    python -m filetime.benchmarks.merged_cells --days 5 --groups 20
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.cell import MergedCell
+
+from filetime.utils.timeparser import ScheduleParser
+
+
+LESSONS_PER_DAY = 6
+
+
+class LinearScanParser(ScheduleParser):
+    # прежняя реализация: перебор всех диапазонов для каждой MergedCell
+    def get_merged_cell_value(self, cell):
+        if isinstance(cell, MergedCell):
+            for merged_range in self.ws.merged_cells.ranges:
+                if cell.coordinate in merged_range:
+                    if merged_range.min_col == cell.column:
+                        top_left_cell = self.ws.cell(
+                            row=merged_range.min_row, column=merged_range.min_col
+                        )
+                        return top_left_cell.value
+        else:
+            return cell.value
+        return None
+
+    def resolve_value(self, row, col, value):
+        return self.get_merged_cell_value(self.ws.cell(row=row, column=col))
+
+
+def build_merged_workbook(days, groups, start=date(2025, 2, 3)):
+    wb = Workbook()
+    fill_merged_sheet(wb.active, days, groups, start=start)
+
+    stream = BytesIO()
+    wb.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def fill_merged_sheet(ws, days, groups, group_prefix="ИС", start=date(2025, 2, 3)):
+    ws.cell(row=1, column=1, value="Расписание")
+    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=2 + groups)
+    ws.cell(row=2, column=1, value="Дата")
+    ws.cell(row=2, column=2, value="Пара")
+    for group in range(groups):
+        ws.cell(row=2, column=3 + group, value=f"{group_prefix}-{group + 1}")
+
+    row = 3
+    for day in range(days):
+        dt = start + timedelta(days=day)
+        ws.cell(row=row, column=1, value=dt.strftime("%d.%m.%Y"))
+        ws.merge_cells(
+            start_row=row, start_column=1,
+            end_row=row + LESSONS_PER_DAY - 1, end_column=1,
+        )
+        for num in range(1, LESSONS_PER_DAY + 1):
+            ws.cell(row=row, column=2, value=num)
+            # лекция на поток из двух групп: горизонтальное объединение
+            for col in range(3, 3 + groups - 1, 2):
+                ws.cell(row=row, column=col, value=f"Математика Иванов И.И. каб. {200 + num}")
+                ws.merge_cells(
+                    start_row=row, start_column=col, end_row=row, end_column=col + 1
+                )
+            row += 1
+
+
+def run(parser_cls, stream):
+    stream.seek(0)
+    parser = parser_cls(stream)
+    started = time.perf_counter()
+    parser.parse_schedule()
+    elapsed = time.perf_counter() - started
+    pairs = sum(len(day) for day in parser.days)
+    return elapsed, pairs, parser.days
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--days", type=int, default=5)
+    arg_parser.add_argument("--groups", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    stream = build_merged_workbook(args.days, args.groups)
+    indexed_time, indexed_pairs, indexed_days = run(ScheduleParser, stream)
+    linear_time, linear_pairs, linear_days = run(LinearScanParser, stream)
+
+    if indexed_days != linear_days:
+        raise SystemExit("Результаты индекса и перебора не совпадают")
+
+    print(f"пар: {indexed_pairs}")
+    print(f"перебор диапазонов: {linear_time:.3f} c")
+    print(f"индекс:             {indexed_time:.3f} c")
+    print(f"ускорение:          x{linear_time / indexed_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
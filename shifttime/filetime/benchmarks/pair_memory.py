@@ -0,0 +1,43 @@
+"""
+Память под разобранные пары: Pair со __slots__ против словарей из шести ключей.
+
+Запуск из каталога shifttime:
+    python -m filetime.benchmarks.pair_memory --days 30 --groups 40
+"""
+import argparse
+import tracemalloc
+
+from filetime.benchmarks.merged_cells import build_merged_workbook
+from filetime.utils.timeparser import ScheduleParser
+
+
+def measure(build):
+    tracemalloc.start()
+    records = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, len(records)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--days", type=int, default=30)
+    arg_parser.add_argument("--groups", type=int, default=40)
+    args = arg_parser.parse_args()
+
+    parser = ScheduleParser(build_merged_workbook(args.days, args.groups))
+    parser.parse_schedule()
+    pairs = list(parser.iter_pairs())
+
+    # прежний формат: отдельный словарь на каждую пару и группу
+    dict_size, count = measure(lambda: [pair.as_dict() for pair in pairs])
+    pair_size, _ = measure(lambda: [pair.__class__(*pair.as_tuple()) for pair in pairs])
+
+    print(f"пар: {count}")
+    print(f"dict:  {dict_size / 1024:.1f} КБ ({dict_size / count:.0f} Б на пару)")
+    print(f"Pair:  {pair_size / 1024:.1f} КБ ({pair_size / count:.0f} Б на пару)")
+    print(f"экономия: {100 * (1 - pair_size / dict_size):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
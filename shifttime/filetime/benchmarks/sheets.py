@@ -0,0 +1,59 @@
+"""
+Разбор многолистовой книги: последовательно и в пуле процессов.
+
+Запуск из каталога shifttime:
+    python -m filetime.benchmarks.sheets --sheets 10 --days 6 --groups 40
+"""
+import argparse
+import os
+import time
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from filetime.benchmarks.merged_cells import fill_merged_sheet
+from filetime.utils.timeparser import parse_workbook
+
+
+def build_multisheet_workbook(sheets, days, groups):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for number in range(sheets):
+        ws = wb.create_sheet(f"Курс {number + 1}")
+        fill_merged_sheet(ws, days, groups, group_prefix=f"К{number + 1}")
+
+    stream = BytesIO()
+    wb.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def run(stream, processes):
+    started = time.perf_counter()
+    parsed = parse_workbook(stream, processes=processes)
+    return time.perf_counter() - started, parsed.pairs
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--sheets", type=int, default=10)
+    arg_parser.add_argument("--days", type=int, default=6)
+    arg_parser.add_argument("--groups", type=int, default=40)
+    arg_parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = arg_parser.parse_args()
+
+    stream = build_multisheet_workbook(args.sheets, args.days, args.groups)
+    serial_time, serial_pairs = run(stream, 1)
+    parallel_time, parallel_pairs = run(stream, args.processes)
+
+    if serial_pairs != parallel_pairs:
+        raise SystemExit("Результаты последовательного и параллельного разбора не совпадают")
+
+    print(f"листов: {args.sheets}, пар: {len(serial_pairs)}, процессов: {args.processes}")
+    print(f"последовательно: {serial_time:.3f} c")
+    print(f"пул процессов:   {parallel_time:.3f} c")
+    print(f"ускорение:       x{serial_time / parallel_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
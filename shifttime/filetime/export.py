@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from filetime.models import TimetableEntry
+
+# строк из базы за один fetch: память не зависит от диапазона дат
+CHUNK_SIZE = 2000
+# ответ отдается кусками примерно такого размера, а не строкой на событие
+BUFFER_SIZE = 64 * 1024
+
+KIND_COLUMNS: Dict[str, str] = {"teacher": "teacher", "group": "group__name"}
+ROW_FIELDS = ("teacher", "group__name", "date", "order", "subject", "room", "updated_at")
+
+CONTENT_TYPES: Dict[str, str] = {
+    "ics": "text/calendar; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+Row = Tuple[str, str, date, int, str, str, datetime]
+Event = Dict[str, Any]
+
+
+def export_rows(
+    kind: str, name: Optional[str] = None,
+    start: Optional[date] = None, end: Optional[date] = None,
+) -> Iterator[Row]:
+    entries = TimetableEntry.objects.all()
+    if name is not None:
+        entries = entries.filter(**{KIND_COLUMNS[kind]: name})
+    if start is not None:
+        entries = entries.filter(date__gte=start)
+    if end is not None:
+        entries = entries.filter(date__lte=end)
+    other = "group__name" if kind == "teacher" else "teacher"
+    return entries.order_by(
+        KIND_COLUMNS[kind], "date", "order", "subject", "room", other
+    ).values_list(*ROW_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def iter_events(kind: str, rows: Iterable[Row]) -> Iterator[Event]:
+    # строки идут по порядку слотов: поток из нескольких групп склеивается в одно событие
+    event: Optional[Event] = None
+    for teacher, group, day, order, subject, room, updated_at in rows:
+        key = teacher if kind == "teacher" else group
+        slot = (key, day, order, subject, room, teacher)
+        if event is not None and event["slot"] == slot:
+            event["groups"].append(group)
+            event["updated_at"] = max(event["updated_at"], updated_at)
+            continue
+        if event is not None:
+            yield event
+        event = {
+            "slot": slot, "key": key, "date": day, "order": order, "subject": subject,
+            "teacher": teacher, "room": room, "groups": [group], "updated_at": updated_at,
+        }
+    if event is not None:
+        yield event
+
+
+def lesson_times(order: int) -> Optional[Tuple[str, str]]:
+    return settings.FILETIME_LESSON_TIMES.get(order)
+
+
+def ics_escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def ics_line(line: str) -> str:
+    # RFC 5545: не длиннее 75 октетов, продолжение с пробела, многобайтные символы не режутся
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    parts: List[str] = []
+    current, size = "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def render_ics(kind: str, name: str, events: Iterable[Event]) -> Iterator[str]:
+    yield ics_line("BEGIN:VCALENDAR")
+    yield ics_line("VERSION:2.0")
+    yield ics_line("PRODID:-//shifttime//filetime//RU")
+    yield ics_line("CALSCALE:GREGORIAN")
+    yield ics_line(f"X-WR-CALNAME:{ics_escape(name)}")
+
+    digest = hashlib.md5(f"{kind}:{name}".encode("utf-8"), usedforsecurity=False).hexdigest()[:16]
+    previous, number = None, 0
+    for event in events:
+        day: date = event["date"]
+        # UID не зависит от предмета: после замены пары календарь обновит событие
+        number = number + 1 if (day, event["order"]) == previous else 0
+        previous = (day, event["order"])
+        suffix = f"-{number}" if number else ""
+        times = lesson_times(event["order"])
+        other = ", ".join(event["groups"]) if kind == "teacher" else event["teacher"]
+        stamp = event["updated_at"].astimezone(timezone.utc)
+
+        yield ics_line("BEGIN:VEVENT")
+        yield ics_line(f"UID:{day:%Y%m%d}-{event['order']}{suffix}-{digest}@shifttime")
+        yield ics_line(f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}")
+        if times:
+            # время без часового пояса: календарь покажет его в местном времени
+            start, end = (time.replace(":", "") for time in times)
+            yield ics_line(f"DTSTART:{day:%Y%m%d}T{start}00")
+            yield ics_line(f"DTEND:{day:%Y%m%d}T{end}00")
+        else:
+            yield ics_line(f"DTSTART;VALUE=DATE:{day:%Y%m%d}")
+        yield ics_line(f"SUMMARY:{ics_escape(event['subject'])}")
+        if event["room"]:
+            yield ics_line(f"LOCATION:{ics_escape(event['room'])}")
+        description = f"Пара {event['order']}: {other}"
+        yield ics_line(f"DESCRIPTION:{ics_escape(description)}")
+        yield ics_line("END:VEVENT")
+    yield ics_line("END:VCALENDAR")
+
+
+class Echo:
+    # csv.writer пишет в write() и получает строку обратно, без буфера в памяти
+    def write(self, value: str) -> str:
+        return value
+
+
+def render_csv(kind: str, name: str, events: Iterable[Event]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    # BOM: Excel иначе открывает UTF-8 с кириллицей как cp1251
+    yield "\ufeff"
+    yield writer.writerow(["Дата", "Пара", "Начало", "Конец", "Предмет", "Преподаватель", "Группы", "Кабинет"])
+    for event in events:
+        start, end = lesson_times(event["order"]) or ("", "")
+        yield writer.writerow([
+            event["date"].isoformat(), event["order"], start, end, event["subject"],
+            event["teacher"], ", ".join(event["groups"]), event["room"],
+        ])
+
+
+RENDERERS: Dict[str, Callable[[str, str, Iterable[Event]], Iterator[str]]] = {
+    "ics": render_ics,
+    "csv": render_csv,
+}
+
+
+def buffered(parts: Iterable[str], size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    chunk: List[str] = []
+    length = 0
+    for part in parts:
+        chunk.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(chunk).encode("utf-8")
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk).encode("utf-8")
+
+
+def export_calendar(
+    fmt: str, kind: str, name: str,
+    start: Optional[date] = None, end: Optional[date] = None,
+) -> Iterator[bytes]:
+    events = iter_events(kind, export_rows(kind, name, start, end))
+    return buffered(RENDERERS[fmt](kind, name, events))
+
+
+def export_filename(name: str, fmt: str) -> str:
+    stem = re.sub(r"[^\w.-]+", "_", name).strip("._") or "export"
+    return f"{stem}.{fmt}"
@@ -0,0 +1,92 @@
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Mapping
+
+from django.db import connection
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("filetime.import")
+
+Metrics = Dict[str, Any]
+
+
+class QueryCounter:
+    # execute_wrapper: число запросов и время в базе без включения DEBUG
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+
+class ImportMetrics:
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.values: Metrics = {}
+
+    @contextmanager
+    def measure(self) -> Iterator["ImportMetrics"]:
+        counter = QueryCounter()
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                yield self
+        finally:
+            self.values["total_s"] = time.perf_counter() - started
+            self.values["queries"] = counter.queries
+            self.values["db_s"] = counter.seconds
+            if self.trace_memory:
+                self.values["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+            elif resource is not None:
+                # без tracemalloc только пик RSS процесса воркера за все время, в КБ на Linux
+                self.values["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.values[name] = self.values.get(name, 0) + time.perf_counter() - started
+
+    def update(self, stats: Mapping[str, Any]) -> None:
+        for key, value in stats.items():
+            self.values[key] = self.values.get(key, 0) + value
+
+    def as_dict(self) -> Metrics:
+        return {
+            key: round(value, 4) if isinstance(value, float) else value
+            for key, value in sorted(self.values.items())
+        }
+
+
+def format_metrics(metrics: Mapping[str, Any]) -> str:
+    return " ".join(f"{key}={value}" for key, value in sorted(metrics.items()))
+
+
+def log_import(job: Any) -> None:
+    # одна строка key=value на импорт, метрики еще и в extra для JSON-форматтеров
+    logger.info(
+        "import job=%s filetime=%s status=%s incremental=%s %s",
+        job.pk, job.filetime_id, job.status, job.incremental, format_metrics(job.metrics),
+        extra={"import_metrics": job.metrics},
+    )
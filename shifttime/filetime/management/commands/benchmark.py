@@ -0,0 +1,200 @@
+import json
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from filetime import search_index, timetable_snapshot
+from filetime.benchmarks.generator import generate_workbook
+from filetime.instrumentation import QueryCounter
+from filetime.models import FileTime, TimetableEntry, save_schedule_from_parser
+from filetime.utils.timeparser import ScheduleParser, parse_workbook
+from filetime.views import render_week, render_week_json
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / "benchmarks" / "baseline.json"
+
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"groups": 10, "weeks": 1},
+    "medium": {"groups": 30, "weeks": 2},
+    "large": {"groups": 60, "weeks": 4},
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Бенчмарки разбора, импорта и чтения расписания на синтетических книгах"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", choices=list(SIZES), default=list(SIZES),
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+        parser.add_argument(
+            "--save-baseline", action="store_true",
+            help="Записать результаты как новый эталон",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=0.25,
+            help="Допустимое замедление относительно эталона, доля (0.25 = 25%%)",
+        )
+
+    def handle(self, *args, **options):
+        results: Dict[str, Dict[str, float]] = {}
+        for size in options["sizes"]:
+            results[size] = self.run_size(SIZES[size], options["repeat"])
+            self.stdout.write(
+                f"{size}: " + ", ".join(f"{k}={v:.4g}" for k, v in results[size].items())
+            )
+
+        if options["save_baseline"]:
+            baseline = self.load_baseline(options["baseline"])
+            baseline.update(
+                {size: {k: round(v, 6) for k, v in metrics.items()} for size, metrics in results.items()}
+            )
+            options["baseline"].write_text(
+                json.dumps(baseline, indent=2, sort_keys=True) + "\n"
+            )
+            self.stdout.write(f"Эталон сохранен: {options['baseline']}")
+            return
+
+        self.compare(results, self.load_baseline(options["baseline"]), options["threshold"])
+
+    def load_baseline(self, path: Path) -> Dict[str, Dict[str, float]]:
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    def compare(self, results, baseline, threshold: float) -> None:
+        regressions: List[str] = []
+        for size, metrics in results.items():
+            for metric, value in metrics.items():
+                # количество запросов и пар сравнивается так же: рост - регрессия
+                reference = baseline.get(size, {}).get(metric)
+                if not reference:
+                    continue
+                change = value / reference - 1
+                if change > threshold:
+                    regressions.append(f"{size}.{metric}: {reference:.4g} -> {value:.4g} (+{change:.0%})")
+
+        if regressions:
+            raise CommandError("Регрессия производительности:\n" + "\n".join(regressions))
+        if baseline:
+            self.stdout.write(f"Регрессий нет (порог {threshold:.0%})")
+        else:
+            self.stdout.write("Эталона нет, сравнение пропущено")
+
+    def run_size(self, size: Dict[str, int], repeat: int) -> Dict[str, float]:
+        stream = generate_workbook(**size)
+
+        def parse_full():
+            stream.seek(0)
+            ScheduleParser(stream).parse_schedule()
+
+        def parse_streaming():
+            stream.seek(0)
+            parser = ScheduleParser(stream, read_only=True)
+            for _ in parser.iter_pairs():
+                pass
+            parser.close()
+
+        def parse_native():
+            stream.seek(0)
+            parser = ScheduleParser(stream, engine="native")
+            for _ in parser.iter_pairs():
+                pass
+            parser.close()
+
+        metrics: Dict[str, float] = {
+            "parse_s": best_of(repeat, parse_full),
+            "parse_streaming_s": best_of(repeat, parse_streaming),
+            "parse_native_s": best_of(repeat, parse_native),
+        }
+        parsed = parse_workbook(stream, processes=1)
+        metrics["pairs"] = len(parsed.pairs)
+        metrics.update(self.measure_db(parsed, repeat))
+        return metrics
+
+    def measure_db(self, parsed, repeat: int) -> Dict[str, float]:
+        metrics: Dict[str, float] = {}
+        week_start: date = min(pair.dt for pair in parsed.pairs).date()
+        week_start = week_start.fromordinal(week_start.toordinal() - week_start.weekday())
+
+        # все записи откатываются, рабочая база не меняется
+        try:
+            with transaction.atomic():
+                filetime = FileTime.objects.bulk_create(
+                    [FileTime(start_date=date(1900, 1, 1), end_date=date(1900, 1, 7), file="benchmark.xlsx")]
+                )[0]
+                # счетчик без connection.queries: при DEBUG журнал запросов ограничен 9000
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    started = time.perf_counter()
+                    save_schedule_from_parser(filetime, parsed)
+                    metrics["ingest_s"] = time.perf_counter() - started
+                metrics["ingest_queries"] = queries.queries
+
+                teachers = list(
+                    TimetableEntry.objects.filter(filetime=filetime)
+                    .values_list("teacher", flat=True).distinct()
+                )
+                groups = list(
+                    TimetableEntry.objects.filter(filetime=filetime)
+                    .values_list("group__name", flat=True).distinct()
+                )
+                metrics["teacher_week_ms"] = 1000 * best_of(
+                    repeat,
+                    lambda: [render_week("teacher", name, week_start) for name in teachers],
+                ) / max(len(teachers), 1)
+                metrics["group_week_ms"] = 1000 * best_of(
+                    repeat,
+                    lambda: [render_week("group", name, week_start) for name in groups],
+                ) / max(len(groups), 1)
+
+                # та же неделя из снимка в mmap: без запросов и без кэша
+                with tempfile.TemporaryDirectory() as directory:
+                    snapshot = timetable_snapshot.TimetableSnapshot(
+                        timetable_snapshot.write_snapshot(
+                            Path(directory) / timetable_snapshot.SNAPSHOT_NAME, today=week_start
+                        )
+                    )
+                    week_end = week_start.fromordinal(week_start.toordinal() + 6)
+                    metrics["snapshot_week_ms"] = 1000 * best_of(
+                        repeat,
+                        lambda: [
+                            render_week_json(
+                                "teacher", name, week_start,
+                                snapshot.week("teacher", name, week_start, week_end),
+                            )
+                            for name in teachers
+                        ],
+                    ) / max(len(teachers), 1)
+
+                # каждый префикс каждого имени - одно нажатие клавиши
+                index = search_index.build_index()
+                keystrokes = [
+                    name[:length] for name in teachers + groups for length in range(1, len(name) + 1)
+                ]
+                metrics["autocomplete_ms"] = 1000 * best_of(
+                    repeat, lambda: [index.search(query) for query in keystrokes]
+                ) / max(len(keystrokes), 1)
+                raise Rollback
+        except Rollback:
+            pass
+        return metrics
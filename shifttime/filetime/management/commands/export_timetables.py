@@ -0,0 +1,44 @@
+from datetime import date
+from itertools import groupby
+from pathlib import Path
+from typing import Set
+
+from django.core.management.base import BaseCommand, CommandError
+
+from filetime import export
+
+
+class Command(BaseCommand):
+    help = "Выгружает расписание каждого преподавателя (или группы) в отдельный файл"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", type=Path)
+        parser.add_argument("--format", choices=list(export.RENDERERS), default="ics")
+        parser.add_argument("--kind", choices=list(export.KIND_COLUMNS), default="teacher")
+        parser.add_argument("--start", type=date.fromisoformat, default=None)
+        parser.add_argument("--end", type=date.fromisoformat, default=None)
+
+    def handle(self, *args, **options):
+        output_dir: Path = options["output_dir"]
+        fmt: str = options["format"]
+        kind: str = options["kind"]
+        if options["start"] and options["end"] and options["start"] > options["end"]:
+            raise CommandError("--start позже --end")
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # один проход по записям, отсортированным по преподавателю: файлы пишутся по очереди,
+        # в памяти только текущее событие и буфер записи
+        rows = export.export_rows(kind, start=options["start"], end=options["end"])
+        events = export.iter_events(kind, rows)
+        written: Set[str] = set()
+        for name, own_events in groupby(events, key=lambda event: event["key"]):
+            filename = export.export_filename(name, fmt)
+            if filename in written:
+                # "Иванов И.И." и "Иванов И И" дают одно имя файла
+                filename = export.export_filename(f"{name}_{len(written)}", fmt)
+            written.add(filename)
+            with open(output_dir / filename, "wb") as file:
+                for chunk in export.buffered(export.RENDERERS[fmt](kind, name, own_events)):
+                    file.write(chunk)
+
+        self.stdout.write(f"Записано файлов: {len(written)} в {output_dir}")
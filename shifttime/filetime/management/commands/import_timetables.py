@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from filetime.models import FileTime, ImportJob
+from filetime.utils.timeparser import ENGINES, Pair, ParsedSchedule, parse_workbook
+
+
+def parse_file(path: str, engine: str) -> Tuple[str, list, dict, float, Optional[str]]:
+    started = time.perf_counter()
+    try:
+        # внутри процесса пула листы разбираются последовательно
+        parsed = parse_workbook(path, processes=1, engine=engine)
+    except Exception as exc:
+        return path, [], {}, time.perf_counter() - started, f"{type(exc).__name__}: {exc}"
+    rows = [pair.as_tuple() for pair in parsed.pairs]
+    return path, rows, parsed.stats, time.perf_counter() - started, None
+
+
+def infer_dates(parsed: ParsedSchedule) -> Tuple[date, date]:
+    days = [pair.dt.date() for pair in parsed.pairs]
+    first, last = min(days), max(days)
+    # неделя понедельник-воскресенье, как у FileTime по умолчанию
+    start = first - timedelta(days=first.weekday())
+    end = last + timedelta(days=6 - last.weekday())
+    return start, end
+
+
+class Command(BaseCommand):
+    help = "Импортирует каталог файлов расписания: разбор в пуле процессов, запись в одном процессе"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", type=Path)
+        parser.add_argument("--pattern", default="*.xlsx")
+        parser.add_argument("--processes", type=int, default=None)
+        parser.add_argument(
+            "--engine", choices=ENGINES, default=settings.FILETIME_PARSER_ENGINE,
+            help="Чтение xlsx: openpyxl или native",
+        )
+        parser.add_argument(
+            "--start-date", type=date.fromisoformat, default=None,
+            help="Дата начала (только для каталога с одним файлом)",
+        )
+        parser.add_argument(
+            "--end-date", type=date.fromisoformat, default=None,
+            help="Дата завершения (только для каталога с одним файлом)",
+        )
+
+    def handle(self, *args, **options):
+        directory: Path = options["directory"]
+        if not directory.is_dir():
+            raise CommandError(f"Каталог не найден: {directory}")
+
+        paths = sorted(str(path) for path in directory.glob(options["pattern"]))
+        if not paths:
+            raise CommandError(f"В {directory} нет файлов {options['pattern']}")
+
+        fixed_dates = options["start_date"] or options["end_date"]
+        if fixed_dates and not (options["start_date"] and options["end_date"]):
+            raise CommandError("--start-date и --end-date задаются вместе")
+        if fixed_dates and len(paths) > 1:
+            raise CommandError("Даты можно задать только для одного файла")
+
+        started = time.perf_counter()
+        imported = skipped = failed = lessons = 0
+
+        with ProcessPoolExecutor(max_workers=options["processes"]) as pool:
+            # разбор параллельный, запись в базу по одному файлу в этом процессе
+            engines = [options["engine"]] * len(paths)
+            for path, rows, stats, parse_time, error in pool.map(parse_file, paths, engines):
+                name = Path(path).name
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: ошибка разбора: {error}")
+                    continue
+                if not rows:
+                    skipped += 1
+                    self.stdout.write(f"{name}: пропущен, пар не найдено")
+                    continue
+
+                parsed = ParsedSchedule([Pair(*row) for row in rows], stats)
+                if fixed_dates:
+                    start_date, end_date = options["start_date"], options["end_date"]
+                else:
+                    start_date, end_date = infer_dates(parsed)
+
+                write_started = time.perf_counter()
+                try:
+                    job = self.write(path, parsed, start_date, end_date)
+                except ValidationError as exc:
+                    skipped += 1
+                    self.stdout.write(f"{name}: пропущен, {' '.join(exc.messages)}")
+                    continue
+                write_time = time.perf_counter() - write_started
+
+                if job.status == ImportJob.FAILED:
+                    failed += 1
+                    self.stderr.write(f"{name}: ошибка записи:\n{job.error}")
+                    continue
+
+                imported += 1
+                lessons += len(rows)
+                self.stdout.write(
+                    f"{name}: {start_date} - {end_date}, пар {len(rows)}, "
+                    f"разбор {parse_time:.2f} c, запись {write_time:.2f} c, "
+                    f"{len(rows) / max(parse_time + write_time, 1e-6):.0f} пар/с"
+                )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Итого: файлов {len(paths)}, импортировано {imported}, "
+            f"пропущено {skipped}, ошибок {failed}, пар {lessons}, "
+            f"{elapsed:.2f} c ({lessons / max(elapsed, 1e-6):.0f} пар/с)"
+        )
+
+    def write(
+        self, path: str, parsed: ParsedSchedule, start_date: date, end_date: date
+    ) -> ImportJob:
+        with open(path, "rb") as src:
+            filetime = FileTime(start_date=start_date, end_date=end_date)
+            filetime.file.save(Path(path).name, File(src), save=False)
+        # файл уже разобран в пуле, задача импорта в очередь не ставится
+        filetime._skip_import = True
+        try:
+            filetime.save()
+        except ValidationError:
+            filetime.file.delete(save=False)
+            raise
+
+        job = ImportJob.objects.create(
+            filetime=filetime, status=ImportJob.RUNNING, started_at=timezone.now()
+        )
+        job.run(parsed=parsed)
+        return job
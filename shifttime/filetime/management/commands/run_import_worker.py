@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from filetime import timetable_snapshot
+from filetime.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = "Обрабатывает очередь импорта загруженных файлов расписания"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Обработать накопившиеся задачи и завершиться",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=settings.FILETIME_IMPORT_POLL_INTERVAL,
+            help="Пауза между опросами очереди, секунд",
+        )
+        parser.add_argument(
+            "--requeue-stale", type=int, default=None, metavar="SECONDS",
+            help="Вернуть в очередь задачи, которые обрабатываются дольше SECONDS",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_stale"] is not None:
+            stale_before = timezone.now() - timedelta(seconds=options["requeue_stale"])
+            requeued = ImportJob.objects.filter(
+                status=ImportJob.RUNNING, started_at__lt=stale_before
+            ).update(status=ImportJob.PENDING, started_at=None)
+            if requeued:
+                self.stdout.write(f"Возвращено в очередь: {requeued}")
+
+        try:
+            while True:
+                job = ImportJob.claim_next()
+                if job is None:
+                    if options["once"]:
+                        break
+                    timetable_snapshot.refresh_if_stale()
+                    time.sleep(options["interval"])
+                    continue
+
+                job.run()
+                self.stdout.write(
+                    f"{job.filetime}: {job.get_status_display()} за {job.duration}"
+                )
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0007_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='incremental',
+            field=models.BooleanField(default=False, help_text='Применить к уже сохраненному расписанию только изменения', verbose_name='Инкрементальный'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_deleted',
+            field=models.PositiveIntegerField(default=0, verbose_name='Удалено'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_inserted',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлено'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_updated',
+            field=models.PositiveIntegerField(default=0, verbose_name='Изменено'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_timetable_entries(apps, schema_editor):
+    FileTime = apps.get_model('filetime', 'FileTime')
+    ScheduleLesson = apps.get_model('filetime', 'ScheduleLesson')
+    TimetableEntry = apps.get_model('filetime', 'TimetableEntry')
+
+    for filetime in FileTime.objects.all():
+        rows = ScheduleLesson.objects.filter(
+            schedule__filetime=filetime, timetable_entry__isnull=True
+        ).select_related('schedule', 'lesson')
+        TimetableEntry.objects.bulk_create(
+            TimetableEntry(
+                filetime=filetime,
+                schedule_lesson=row,
+                teacher=row.lesson.teacher,
+                group=row.group,
+                date=row.schedule.day,
+                order=row.order,
+                subject=row.lesson.name,
+                room=row.lesson.room,
+            )
+            for row in rows.iterator()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0008_importjob_incremental_importjob_rows_deleted_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimetableEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('teacher', models.CharField(max_length=100, verbose_name='ФИО преподавателя')),
+                ('group', models.CharField(max_length=50, verbose_name='Группа')),
+                ('date', models.DateField(verbose_name='День')),
+                ('order', models.PositiveSmallIntegerField(verbose_name='Order')),
+                ('subject', models.CharField(max_length=255, verbose_name='Предмет')),
+                ('room', models.CharField(max_length=50, verbose_name='Кабинет')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('filetime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entries', to='filetime.filetime', verbose_name='Файл расписания')),
+                ('schedule_lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entry', to='filetime.schedulelesson', verbose_name='Scheduled Lesson')),
+            ],
+            options={
+                'verbose_name': 'Timetable entry',
+                'verbose_name_plural': 'Timetable entries',
+                'ordering': ['date', 'order'],
+                'indexes': [models.Index(fields=['teacher', 'date', 'order'], name='timetable_teacher_week'), models.Index(fields=['group', 'date', 'order'], name='timetable_group_week')],
+            },
+        ),
+        migrations.RunPython(fill_timetable_entries, migrations.RunPython.noop),
+    ]
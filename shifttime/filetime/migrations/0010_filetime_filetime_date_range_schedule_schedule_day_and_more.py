@@ -0,0 +1,50 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+def merge_duplicate_lessons(apps, schema_editor):
+    Lesson = apps.get_model('filetime', 'Lesson')
+    ScheduleLesson = apps.get_model('filetime', 'ScheduleLesson')
+
+    kept = {}
+    duplicates = {}
+    for pk, teacher, name, room in Lesson.objects.order_by('pk').values_list(
+        'pk', 'teacher', 'name', 'room'
+    ):
+        key = (teacher, name, room)
+        if key in kept:
+            duplicates[pk] = kept[key]
+        else:
+            kept[key] = pk
+
+    for duplicate_pk, kept_pk in duplicates.items():
+        ScheduleLesson.objects.filter(lesson_id=duplicate_pk).update(lesson_id=kept_pk)
+    Lesson.objects.filter(pk__in=list(duplicates)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0009_timetableentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lessons, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='filetime',
+            index=models.Index(fields=['start_date', 'end_date'], name='filetime_date_range'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['day'], name='schedule_day'),
+        ),
+        migrations.AddIndex(
+            model_name='schedulelesson',
+            index=models.Index(fields=['schedule', 'group', 'order'], name='schedulelesson_group_order'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('teacher', 'name', 'room'), name='lesson_teacher_name_room'),
+        ),
+    ]
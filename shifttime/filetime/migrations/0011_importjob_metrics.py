@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0010_filetime_filetime_date_range_schedule_schedule_day_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict, help_text='Время этапов в секундах, счетчики строк и запросов, пик памяти', verbose_name='Метрики'),
+        ),
+    ]
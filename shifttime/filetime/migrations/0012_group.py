@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0011_importjob_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Group',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Group',
+                'verbose_name_plural': 'Groups',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='schedulelesson',
+            name='groups',
+            field=models.ManyToManyField(related_name='schedule_lessons', to='filetime.group', verbose_name='Группы'),
+        ),
+        migrations.AddField(
+            model_name='timetableentry',
+            name='group_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='filetime.group'),
+        ),
+        migrations.AlterField(
+            model_name='timetableentry',
+            name='schedule_lesson',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entries', to='filetime.schedulelesson', verbose_name='Scheduled Lesson'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations
+from django.db.models import Case, Value, When
+
+BATCH_SIZE = 500
+
+
+def merge_group_rows(apps, schema_editor):
+    Group = apps.get_model('filetime', 'Group')
+    ScheduleLesson = apps.get_model('filetime', 'ScheduleLesson')
+    TimetableEntry = apps.get_model('filetime', 'TimetableEntry')
+    Through = ScheduleLesson.groups.through
+
+    names = set(ScheduleLesson.objects.values_list('group', flat=True).distinct())
+    names |= set(TimetableEntry.objects.values_list('group', flat=True).distinct())
+    Group.objects.bulk_create([Group(name=name) for name in names], ignore_conflicts=True)
+    group_ids = dict(Group.objects.values_list('name', 'pk'))
+
+    # строки одной пары у разных групп сливаются в первую из них
+    kept = {}
+    moved = []
+    links = set()
+    rows = ScheduleLesson.objects.order_by('pk').values_list(
+        'pk', 'schedule_id', 'order', 'lesson_id', 'group'
+    )
+    for pk, schedule_id, order, lesson_id, group in rows.iterator():
+        target = kept.setdefault((schedule_id, order, lesson_id), pk)
+        if target != pk:
+            moved.append((pk, target))
+        links.add((target, group_ids[group]))
+
+    Through.objects.bulk_create(
+        [Through(schedulelesson_id=pk, group_id=group_id) for pk, group_id in links],
+        batch_size=BATCH_SIZE,
+    )
+    for start in range(0, len(moved), BATCH_SIZE):
+        chunk = moved[start:start + BATCH_SIZE]
+        TimetableEntry.objects.filter(schedule_lesson_id__in=[pk for pk, _ in chunk]).update(
+            schedule_lesson_id=Case(
+                *[When(schedule_lesson_id=pk, then=Value(target)) for pk, target in chunk]
+            )
+        )
+        ScheduleLesson.objects.filter(pk__in=[pk for pk, _ in chunk]).delete()
+
+    for name, group_id in group_ids.items():
+        TimetableEntry.objects.filter(group=name).update(group_ref_id=group_id)
+
+
+def split_group_rows(apps, schema_editor):
+    Group = apps.get_model('filetime', 'Group')
+    ScheduleLesson = apps.get_model('filetime', 'ScheduleLesson')
+    TimetableEntry = apps.get_model('filetime', 'TimetableEntry')
+    Through = ScheduleLesson.groups.through
+
+    names_by_lesson = {}
+    links = Through.objects.order_by('schedulelesson_id', 'group__name').values_list(
+        'schedulelesson_id', 'group__name'
+    )
+    for pk, name in links.iterator():
+        names_by_lesson.setdefault(pk, []).append(name)
+
+    for lesson in ScheduleLesson.objects.order_by('pk').iterator():
+        names = names_by_lesson.get(lesson.pk) or ['']
+        lesson.group = names[0]
+        lesson.save(update_fields=['group'])
+        for name in names[1:]:
+            copy = ScheduleLesson.objects.create(
+                schedule_id=lesson.schedule_id, lesson_id=lesson.lesson_id,
+                order=lesson.order, group=name,
+            )
+            TimetableEntry.objects.filter(
+                schedule_lesson_id=lesson.pk, group_ref__name=name
+            ).update(schedule_lesson_id=copy.pk)
+
+    for group_id, name in Group.objects.values_list('pk', 'name'):
+        TimetableEntry.objects.filter(group_ref_id=group_id).update(group=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0012_group'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_group_rows, split_group_rows),
+    ]
@@ -0,0 +1,57 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0013_group_data'),
+    ]
+
+    operations = [
+        # default нужен только для обратной миграции: поля вернутся на заполненные таблицы
+        migrations.AlterField(
+            model_name='schedulelesson',
+            name='group',
+            field=models.CharField(default='', max_length=50, verbose_name='Группа'),
+        ),
+        migrations.AlterField(
+            model_name='timetableentry',
+            name='group',
+            field=models.CharField(default='', max_length=50, verbose_name='Группа'),
+        ),
+        migrations.RemoveIndex(
+            model_name='schedulelesson',
+            name='schedulelesson_group_order',
+        ),
+        migrations.RemoveField(
+            model_name='schedulelesson',
+            name='group',
+        ),
+        migrations.AddIndex(
+            model_name='schedulelesson',
+            index=models.Index(fields=['schedule', 'order'], name='schedulelesson_order'),
+        ),
+        migrations.RemoveIndex(
+            model_name='timetableentry',
+            name='timetable_group_week',
+        ),
+        migrations.RemoveField(
+            model_name='timetableentry',
+            name='group',
+        ),
+        migrations.RenameField(
+            model_name='timetableentry',
+            old_name='group_ref',
+            new_name='group',
+        ),
+        migrations.AlterField(
+            model_name='timetableentry',
+            name='group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entries', to='filetime.group', verbose_name='Группа'),
+        ),
+        migrations.AddIndex(
+            model_name='timetableentry',
+            index=models.Index(fields=['group', 'date', 'order'], name='timetable_group_week'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filetime', '0014_remove_schedulelesson_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='conflict_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Конфликтов'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='conflicts',
+            field=models.JSONField(blank=True, default=list, help_text='Накладки преподавателей, кабинетов и групп после импорта', verbose_name='Конфликты'),
+        ),
+    ]
@@ -1,11 +1,26 @@
-from datetime import date, timedelta
-from typing import Any, Dict, List
-from django.db import models
+import traceback
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from filetime.utils.timeparser import ScheduleParser
+from filetime import timetable_cache, timetable_snapshot
+from filetime.instrumentation import ImportMetrics, log_import
+from filetime.utils.conflicts import Conflict, find_conflicts
+from filetime.utils.parsecache import ParseCache
+from filetime.utils.timeparser import (
+    Pair,
+    ParsedSchedule,
+    ScheduleParser,
+    lesson_order,
+    list_sheets,
+    parse_cached,
+    parse_workbook,
+)
 
 
 def next_week_start() -> date:
@@ -31,6 +46,23 @@ class Lesson(models.Model):
     class Meta:
         verbose_name = "Lesson"
         verbose_name_plural = "Lessons"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["teacher", "name", "room"], name="lesson_teacher_name_room"
+            ),
+        ]
+
+
+class Group(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="Группа")
+
+    def __str__(self) -> str:
+        return self.name
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Group"
+        verbose_name_plural = "Groups"
 
 
 class Schedule(models.Model):
@@ -46,6 +78,9 @@ class Schedule(models.Model):
         ordering = ["day"]
         verbose_name = "Schedule"
         verbose_name_plural = "Schedules"
+        indexes = [
+            models.Index(fields=["day"], name="schedule_day"),
+        ]
 
 
 class ScheduleLesson(models.Model):
@@ -53,7 +88,10 @@ class ScheduleLesson(models.Model):
         Schedule, on_delete=models.CASCADE, verbose_name="Schedule"
     )
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, verbose_name="Lesson")
-    group = models.CharField(max_length=50, verbose_name="Группа")
+    # одна пара на все группы, у которых она идет: лекция на поток - одна строка
+    groups = models.ManyToManyField(
+        Group, related_name="schedule_lessons", verbose_name="Группы"
+    )
     order = models.PositiveSmallIntegerField(
         verbose_name="Order",
         help_text="Lesson order for the day (e.g. 1st period, 2nd period, etc.)",
@@ -67,6 +105,9 @@ class ScheduleLesson(models.Model):
         verbose_name = "Scheduled Lesson"
         verbose_name_plural = "Scheduled Lessons"
         # unique_together = (("schedule", "order"),)
+        indexes = [
+            models.Index(fields=["schedule", "order"], name="schedulelesson_order"),
+        ]
 
 
 class FileTime(models.Model):
@@ -101,46 +142,500 @@ class FileTime(models.Model):
 
     def save(self, *args: Any, **kwargs: Any) -> None:
         self.full_clean()
+        self._file_replaced = bool(self.pk) and (
+            FileTime.objects.filter(pk=self.pk).values_list("file", flat=True).first()
+            != self.file.name
+        )
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "FileTime"
         verbose_name_plural = "FileTimes"
+        indexes = [
+            models.Index(fields=["start_date", "end_date"], name="filetime_date_range"),
+        ]
+
+
+class ImportJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "В очереди"),
+        (RUNNING, "Обрабатывается"),
+        (DONE, "Готово"),
+        (FAILED, "Ошибка"),
+    ]
+
+    filetime = models.ForeignKey(
+        FileTime, on_delete=models.CASCADE, related_name="import_jobs",
+        verbose_name="Файл расписания",
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True,
+        verbose_name="Статус",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начато")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    incremental = models.BooleanField(
+        default=False, verbose_name="Инкрементальный",
+        help_text="Применить к уже сохраненному расписанию только изменения",
+    )
+    rows_inserted = models.PositiveIntegerField(default=0, verbose_name="Добавлено")
+    rows_updated = models.PositiveIntegerField(default=0, verbose_name="Изменено")
+    rows_deleted = models.PositiveIntegerField(default=0, verbose_name="Удалено")
+    metrics = models.JSONField(
+        default=dict, blank=True, verbose_name="Метрики",
+        help_text="Время этапов в секундах, счетчики строк и запросов, пик памяти",
+    )
+    conflict_count = models.PositiveIntegerField(default=0, verbose_name="Конфликтов")
+    conflicts = models.JSONField(
+        default=list, blank=True, verbose_name="Конфликты",
+        help_text="Накладки преподавателей, кабинетов и групп после импорта",
+    )
 
+    def __str__(self) -> str:
+        return f"Import {self.filetime_id}: {self.status}"
+
+    @property
+    def duration(self) -> Optional[timedelta]:
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
+    @classmethod
+    def claim_next(cls) -> Optional["ImportJob"]:
+        # UPDATE с условием на статус атомарен и в SQLite: задачу получит один воркер
+        pending = cls.objects.filter(status=cls.PENDING).order_by("created_at", "pk")
+        for job_id in pending.values_list("pk", flat=True)[:10]:
+            claimed = cls.objects.filter(pk=job_id, status=cls.PENDING).update(
+                status=cls.RUNNING, started_at=timezone.now()
+            )
+            if claimed:
+                return cls.objects.select_related("filetime").get(pk=job_id)
+        return None
+
+    def run(self, parsed: Optional["ParsedSource"] = None) -> None:
+        metrics = ImportMetrics(trace_memory=settings.FILETIME_IMPORT_TRACE_MEMORY)
+        try:
+            with metrics.measure():
+                # уже разобранный результат передает массовый импорт каталога
+                with metrics.stage("open_s"):
+                    if parsed is not None:
+                        parser = parsed
+                    else:
+                        parser = parse_schedule_file(self.filetime.file.path)
+                try:
+                    # потоковый парсер читает лист здесь же, его этапы в stats
+                    with metrics.stage("save_s"):
+                        # повтор после сбоя на следующих этапах: строки файла уже
+                        # сохранены, полный импорт задвоил бы их
+                        if self.incremental or self.filetime.schedules.exists():
+                            changes = reimport_schedule_from_parser(self.filetime, parser)
+                        else:
+                            changes = save_schedule_from_parser(self.filetime, parser)
+                finally:
+                    metrics.update(parser.stats)
+                    parser.close()
+                # по сохраненным записям: при инкрементальном импорте файл покрывает не все
+                with metrics.stage("conflicts_s"):
+                    conflicts = stored_conflicts(self.filetime.timetable_entries.all())
+                with metrics.stage("snapshot_s"):
+                    timetable_snapshot.refresh()
+        except Exception:
+            self.status = self.FAILED
+            self.error = traceback.format_exc()
+        else:
+            self.status = self.DONE
+            self.error = ""
+            self.rows_inserted, self.rows_updated, self.rows_deleted = changes
+            self.conflict_count = len(conflicts)
+            self.conflicts = [
+                serialize_conflict(conflict) for conflict in conflicts[:MAX_STORED_CONFLICTS]
+            ]
+            timetable_cache.bump_version()
+        self.finished_at = timezone.now()
+        self.metrics = metrics.as_dict()
+        self.save(
+            update_fields=[
+                "status", "error", "finished_at",
+                "rows_inserted", "rows_updated", "rows_deleted", "metrics",
+                "conflict_count", "conflicts",
+            ]
+        )
+        log_import(self)
 
-def save_schedule_from_parser(
-    filetime_instance: FileTime, parser: ScheduleParser
-) -> None:
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+
+
+class TimetableEntry(models.Model):
+    # денормализованная копия ScheduleLesson для API: чтение без join-ов
+    filetime = models.ForeignKey(
+        FileTime, on_delete=models.CASCADE, related_name="timetable_entries",
+        verbose_name="Файл расписания",
+    )
+    # по записи на каждую группу пары
+    schedule_lesson = models.ForeignKey(
+        ScheduleLesson, on_delete=models.CASCADE, related_name="timetable_entries",
+        verbose_name="Scheduled Lesson",
+    )
+    teacher = models.CharField(max_length=100, verbose_name="ФИО преподавателя")
+    group = models.ForeignKey(
+        Group, on_delete=models.CASCADE, related_name="timetable_entries",
+        verbose_name="Группа",
+    )
+    date = models.DateField(verbose_name="День")
+    order = models.PositiveSmallIntegerField(verbose_name="Order")
+    subject = models.CharField(max_length=255, verbose_name="Предмет")
+    room = models.CharField(max_length=50, verbose_name="Кабинет")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    def __str__(self) -> str:
+        return f"{self.teacher}: {self.subject} on {self.date} (Order {self.order})"
+
+    class Meta:
+        ordering = ["date", "order"]
+        verbose_name = "Timetable entry"
+        verbose_name_plural = "Timetable entries"
+        indexes = [
+            models.Index(fields=["teacher", "date", "order"], name="timetable_teacher_week"),
+            models.Index(fields=["group", "date", "order"], name="timetable_group_week"),
+        ]
+
+
+ParsedSource = Union[ScheduleParser, ParsedSchedule]
+
+
+def get_parse_cache() -> ParseCache:
+    return ParseCache(
+        Path(settings.MEDIA_ROOT) / "parse_cache",
+        max_bytes=settings.FILETIME_PARSE_CACHE_MAX_BYTES,
+    )
+
+
+def parse_schedule_file(path: str) -> ParsedSource:
+    engine: str = settings.FILETIME_PARSER_ENGINE
+    if settings.FILETIME_PARSE_CACHE_MAX_BYTES:
+        return parse_cached(path, get_parse_cache(), engine=engine)
+    if len(list_sheets(path, engine)) > 1:
+        return parse_workbook(path, engine=engine)
+    return ScheduleParser(path, read_only=True, engine=engine)
+
+
+LessonKey = Tuple[str, str, str]
+
+
+def get_or_create_lessons(keys: Iterable[LessonKey]) -> Dict[LessonKey, Lesson]:
+    keys = set(keys)
+    teachers = {teacher for _, teacher, _ in keys}
+
+    lessons: Dict[LessonKey, Lesson] = {}
+    for lesson in Lesson.objects.filter(teacher__in=teachers):
+        key = (lesson.name, lesson.teacher, lesson.room)
+        if key in keys:
+            lessons[key] = lesson
+
+    missing = [
+        Lesson(name=name, teacher=teacher, room=room)
+        for name, teacher, room in keys
+        if (name, teacher, room) not in lessons
+    ]
+    # upsert по уникальному (teacher, name, room): параллельный импорт не создаст дублей
+    created = Lesson.objects.bulk_create(
+        missing,
+        update_conflicts=True,
+        unique_fields=["teacher", "name", "room"],
+        update_fields=["name"],
+    )
+    for lesson in created:
+        lessons[(lesson.name, lesson.teacher, lesson.room)] = lesson
+    return lessons
+
+
+def get_or_create_groups(names: Iterable[str]) -> Dict[str, Group]:
+    names = set(names)
+    groups: Dict[str, Group] = {
+        group.name: group for group in Group.objects.filter(name__in=names)
+    }
+    created = Group.objects.bulk_create(
+        [Group(name=name) for name in names if name not in groups],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["name"],
+    )
+    for group in created:
+        groups[group.name] = group
+    return groups
+
+
+class ImportChanges(NamedTuple):
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
 
-    schedule_data: Dict[date, Dict[int, str]] = {}
 
-    for row in parser.days:
-        for pair in row:
-            dt: date = pair["dt"]
-            group: int = pair["group"]
+RowKey = Tuple[date, int, LessonKey]
+GroupNames = Tuple[str, ...]
+LinkedLessons = List[Tuple[ScheduleLesson, GroupNames]]
 
-            if dt not in schedule_data:
-                schedule_data[dt] = {}
 
-            schedule_data[dt][group] = pair
+def collect_schedule_rows(parser: ParsedSource) -> Dict[RowKey, GroupNames]:
+    # (день, номер пары, предмет) -> группы, у которых он идет
+    rows: Dict[RowKey, Dict[str, None]] = {}
 
-    for dt, lessons in schedule_data.items():
-        schedule = Schedule.objects.create(day=dt)
-        for group, pair in lessons.items():
-            lesson, _ = Lesson.objects.get_or_create(
-                name=pair["subj"], teacher=pair["teacher"], room=pair["room"]
+    for pair in parser.iter_pairs():
+        dt = pair["dt"]
+        day: date = dt.date() if isinstance(dt, datetime) else dt
+        lesson_key: LessonKey = (pair["subj"], pair["teacher"], pair["room"])
+
+        # номер пары строкой ("1") совпадает с сохраненным числом
+        rows.setdefault((day, lesson_order(pair)[1], lesson_key), {})[pair["group"]] = None
+
+    return {row_key: tuple(sorted(groups)) for row_key, groups in rows.items()}
+
+
+def create_schedules(filetime_instance: FileTime, days: Iterable[date]) -> Dict[date, Schedule]:
+    schedules: List[Schedule] = Schedule.objects.bulk_create(
+        [Schedule(day=day) for day in days]
+    )
+    FileTime.schedules.through.objects.bulk_create(
+        [
+            FileTime.schedules.through(
+                filetime_id=filetime_instance.pk, schedule_id=schedule.pk
+            )
+            for schedule in schedules
+        ]
+    )
+    return {schedule.day: schedule for schedule in schedules}
+
+
+def link_groups(linked: LinkedLessons, groups: Dict[str, Group]) -> None:
+    ScheduleLesson.groups.through.objects.bulk_create(
+        [
+            ScheduleLesson.groups.through(
+                schedulelesson_id=schedule_lesson.pk, group_id=groups[name].pk
             )
-            ScheduleLesson.objects.create(
-                schedule=schedule, lesson=lesson, order=pair["lesson_num"], group=group
+            for schedule_lesson, names in linked
+            for name in names
+        ]
+    )
+
+
+def create_timetable_entries(
+    filetime_instance: FileTime, linked: LinkedLessons, groups: Dict[str, Group]
+) -> None:
+    TimetableEntry.objects.bulk_create(
+        [
+            TimetableEntry(
+                filetime=filetime_instance,
+                schedule_lesson_id=schedule_lesson.pk,
+                teacher=schedule_lesson.lesson.teacher,
+                group_id=groups[name].pk,
+                date=schedule_lesson.schedule.day,
+                order=schedule_lesson.order,
+                subject=schedule_lesson.lesson.name,
+                room=schedule_lesson.lesson.room,
             )
-        filetime_instance.schedules.add(schedule)
+            for schedule_lesson, names in linked
+            for name in names
+        ]
+    )
+
+
+@transaction.atomic
+def save_schedule_from_parser(
+    filetime_instance: FileTime, parser: ParsedSource
+) -> ImportChanges:
+
+    rows = collect_schedule_rows(parser)
+
+    lessons = get_or_create_lessons(lesson_key for _, _, lesson_key in rows)
+    groups = get_or_create_groups(name for names in rows.values() for name in names)
+    schedules = create_schedules(
+        filetime_instance, dict.fromkeys(day for day, _, _ in rows)
+    )
+
+    created = ScheduleLesson.objects.bulk_create(
+        [
+            ScheduleLesson(schedule=schedules[day], lesson=lessons[lesson_key], order=order)
+            for day, order, lesson_key in rows
+        ]
+    )
+    linked = list(zip(created, rows.values()))
+    link_groups(linked, groups)
+    create_timetable_entries(filetime_instance, linked, groups)
+    return ImportChanges(inserted=len(created))
+
+
+@transaction.atomic
+def reimport_schedule_from_parser(
+    filetime_instance: FileTime, parser: ParsedSource
+) -> ImportChanges:
+
+    new_slots: Dict[Tuple[date, int], Dict[LessonKey, GroupNames]] = {}
+    for (day, order, lesson_key), names in collect_schedule_rows(parser).items():
+        new_slots.setdefault((day, order), {})[lesson_key] = names
+
+    stored_groups: Dict[int, List[str]] = {}
+    links = ScheduleLesson.groups.through.objects.filter(
+        schedulelesson__schedule__filetime=filetime_instance
+    ).values_list("schedulelesson_id", "group__name")
+    for pk, name in links:
+        stored_groups.setdefault(pk, []).append(name)
+
+    old_slots: Dict[Tuple[date, int], List[Tuple[int, LessonKey, GroupNames]]] = {}
+    stored = ScheduleLesson.objects.filter(
+        schedule__filetime=filetime_instance
+    ).values_list(
+        "pk", "schedule__day", "order", "lesson__name", "lesson__teacher", "lesson__room",
+    )
+    for pk, day, order, name, teacher, room in stored:
+        names = tuple(sorted(stored_groups.get(pk, ())))
+        old_slots.setdefault((day, order), []).append((pk, (name, teacher, room), names))
+
+    to_insert: List[Tuple[RowKey, GroupNames]] = []
+    to_update: List[Tuple[int, RowKey, GroupNames]] = []
+    to_delete: List[int] = []
+
+    for day, order in new_slots.keys() | old_slots.keys():
+        new = new_slots.get((day, order), {})
+        kept = set()
+        changed_old: List[Tuple[int, GroupNames]] = []
+        for pk, lesson_key, names in old_slots.get((day, order), []):
+            if lesson_key not in kept and new.get(lesson_key) == names:
+                kept.add(lesson_key)
+            else:
+                changed_old.append((pk, names))
+
+        # строки переписываются на месте, сначала те, у которых те же группы
+        added: Dict[GroupNames, List[LessonKey]] = {}
+        for lesson_key, names in new.items():
+            if lesson_key not in kept:
+                added.setdefault(names, []).append(lesson_key)
+        unmatched_old: List[int] = []
+        for pk, names in changed_old:
+            if added.get(names):
+                to_update.append((pk, (day, order, added[names].pop()), names))
+            else:
+                unmatched_old.append(pk)
+        unmatched_new = [
+            ((day, order, lesson_key), names)
+            for names, lesson_keys in added.items()
+            for lesson_key in lesson_keys
+        ]
+        to_update.extend(
+            (pk, row_key, names) for pk, (row_key, names) in zip(unmatched_old, unmatched_new)
+        )
+        to_insert.extend(unmatched_new[len(unmatched_old):])
+        to_delete.extend(unmatched_old[len(unmatched_new):])
+
+    lessons = get_or_create_lessons(
+        [lesson_key for (_, _, lesson_key), _ in to_insert]
+        + [lesson_key for _, (_, _, lesson_key), _ in to_update]
+    )
+    groups = get_or_create_groups(
+        [name for _, names in to_insert for name in names]
+        + [name for _, _, names in to_update for name in names]
+    )
+
+    schedules: Dict[date, Schedule] = {}
+    for schedule in filetime_instance.schedules.order_by("pk"):
+        schedules.setdefault(schedule.day, schedule)
+    missing_days = dict.fromkeys(
+        day for (day, _, _), _ in to_insert if day not in schedules
+    )
+    schedules.update(create_schedules(filetime_instance, missing_days))
+
+    if to_delete:
+        ScheduleLesson.objects.filter(pk__in=to_delete).delete()
+    updated = [
+        ScheduleLesson(
+            pk=pk, schedule=schedules[day], lesson=lessons[lesson_key], order=order
+        )
+        for pk, (day, order, lesson_key), _ in to_update
+    ]
+    ScheduleLesson.objects.bulk_update(updated, ["lesson"])
+    if updated:
+        updated_ids = [pk for pk, _, _ in to_update]
+        ScheduleLesson.groups.through.objects.filter(
+            schedulelesson_id__in=updated_ids
+        ).delete()
+        TimetableEntry.objects.filter(schedule_lesson_id__in=updated_ids).delete()
+    inserted = ScheduleLesson.objects.bulk_create(
+        [
+            ScheduleLesson(
+                schedule=schedules[day], lesson=lessons[lesson_key], order=order
+            )
+            for (day, order, lesson_key), _ in to_insert
+        ]
+    )
+
+    linked: LinkedLessons = list(zip(updated, [names for _, _, names in to_update]))
+    linked += zip(inserted, [names for _, names in to_insert])
+    link_groups(linked, groups)
+    create_timetable_entries(filetime_instance, linked, groups)
+
+    # дни, которых больше нет в файле
+    new_days = {day for day, _ in new_slots}
+    filetime_instance.schedules.exclude(day__in=new_days).delete()
+
+    return ImportChanges(
+        inserted=len(to_insert), updated=len(to_update), deleted=len(to_delete)
+    )
+
+
+MAX_STORED_CONFLICTS = 200
+
+
+def stored_conflicts(entries: "models.QuerySet[TimetableEntry]") -> List[Conflict]:
+    rows = entries.values_list("subject", "group__name", "date", "order", "teacher", "room")
+    return find_conflicts(Pair(*row) for row in rows.iterator())
+
+
+def serialize_conflict(conflict: Conflict) -> Dict[str, Any]:
+    return {
+        "kind": conflict.kind,
+        "key": conflict.key,
+        "date": conflict.dt.isoformat(),
+        "lesson_num": conflict.lesson_num,
+        "lessons": sorted(
+            {f"{pair.group}: {pair.subj} {pair.teacher} {pair.room}".strip() for pair in conflict.pairs}
+        ),
+    }
+
+
+def enqueue_import(filetime_instance: FileTime, incremental: bool = False) -> ImportJob:
+    job = ImportJob.objects.create(filetime=filetime_instance, incremental=incremental)
+    if not settings.FILETIME_IMPORT_ASYNC:
+        job.status = ImportJob.RUNNING
+        job.started_at = timezone.now()
+        job.run()
+    return job
 
 
 @receiver(post_save, sender=FileTime)
 def post_process_document(
     sender: Any, instance: FileTime, created: bool, **kwargs: Any
 ) -> None:
+    # до commit другой запрос закэшировал бы неделю по старым строкам под новой версией
+    transaction.on_commit(timetable_cache.bump_version)
+    if getattr(instance, "_skip_import", False):
+        return
     if created and instance.file:
-        parser: ScheduleParser = ScheduleParser(instance.file.path)
-        parser.parse_schedule()
-        save_schedule_from_parser(instance, parser)
+        enqueue_import(instance)
+    elif getattr(instance, "_file_replaced", False) and instance.file:
+        # исправленный файл для той же недели: применяем только изменения
+        enqueue_import(instance, incremental=True)
+
+
+@receiver(post_delete, sender=FileTime)
+def invalidate_deleted_document(sender: Any, instance: FileTime, **kwargs: Any) -> None:
+    # записи удаляются в той же транзакции: версия и снимок меняются после commit
+    transaction.on_commit(timetable_cache.bump_version)
+    transaction.on_commit(timetable_snapshot.refresh)
@@ -0,0 +1,146 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from filetime import timetable_cache
+from filetime.models import TimetableEntry
+
+KINDS: Tuple[str, ...] = ("teacher", "group", "room")
+# колонка TimetableEntry для каждого вида: в индекс попадает только текущее расписание
+SOURCES: Dict[str, str] = {"teacher": "teacher", "group": "group__name", "room": "room"}
+
+PUNCTUATION_PATTERN = re.compile(r"[\W_]+")
+# доля триграмм запроса, ниже которой опечатка не считается совпадением
+MIN_SIMILARITY = 0.4
+
+Match = Tuple[str, str]
+
+
+def normalize(text: str) -> str:
+    # "Фёдоров  Ф.Ф." -> "федоров ф ф"
+    text = text.casefold().replace("ё", "е")
+    return PUNCTUATION_PATTERN.sub(" ", text).strip()
+
+
+def tokens_match(query_tokens: List[str], name: str) -> bool:
+    # каждому слову запроса свое слово имени: "иванов и и" не находит "Иванова А.С."
+    free = name.split()
+    for token in sorted(query_tokens, key=len, reverse=True):
+        for position, candidate in enumerate(free):
+            if candidate.startswith(token):
+                del free[position]
+                break
+        else:
+            return False
+    return True
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, names: Dict[str, Iterable[str]], version: Optional[int] = None) -> None:
+        self.version = version
+        self.entries: List[Match] = []
+        self.normalized: List[str] = []
+        tokens: List[Tuple[str, int]] = []
+        self.trigram_index: Dict[str, List[int]] = {}
+
+        for kind, kind_names in names.items():
+            for name in sorted(set(kind_names)):
+                if not name:
+                    continue
+                entry_id = len(self.entries)
+                normalized = normalize(name)
+                self.entries.append((kind, name))
+                self.normalized.append(normalized)
+                tokens.extend((token, entry_id) for token in normalized.split())
+                for gram in trigrams(normalized):
+                    self.trigram_index.setdefault(gram, []).append(entry_id)
+
+        # отсортированные токены: все токены с префиксом - один диапазон bisect
+        tokens.sort()
+        self.tokens = [token for token, _ in tokens]
+        self.token_ids = [entry_id for _, entry_id in tokens]
+
+    def prefix_ids(self, prefix: str) -> Set[int]:
+        start = bisect_left(self.tokens, prefix)
+        ids = set()
+        for position in range(start, len(self.tokens)):
+            if not self.tokens[position].startswith(prefix):
+                break
+            ids.add(self.token_ids[position])
+        return ids
+
+    def search(
+        self, query: str, kinds: Iterable[str] = KINDS, limit: int = 10
+    ) -> List[Match]:
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        kinds = set(kinds)
+
+        # каждое слово запроса - начало какого-то слова имени: "иванов и" -> "Иванов И.И."
+        query_tokens = normalized.split()
+        found: Optional[Set[int]] = None
+        for token in query_tokens:
+            ids = self.prefix_ids(token)
+            found = ids if found is None else found & ids
+            if not found:
+                break
+        matches = sorted(
+            (
+                entry_id for entry_id in found or ()
+                if self.entries[entry_id][0] in kinds
+                and (len(query_tokens) == 1 or tokens_match(query_tokens, self.normalized[entry_id]))
+            ),
+            key=lambda entry_id: (
+                not self.normalized[entry_id].startswith(normalized),
+                self.entries[entry_id][1],
+            ),
+        )[:limit]
+
+        if not matches:
+            # опечатка: доля триграмм запроса, найденных в имени
+            grams = trigrams(normalized)
+            shared: Counter = Counter()
+            for gram in grams:
+                shared.update(self.trigram_index.get(gram, ()))
+            scored = sorted(
+                (-count / len(grams), self.entries[entry_id][1], entry_id)
+                for entry_id, count in shared.items()
+                if self.entries[entry_id][0] in kinds and count / len(grams) >= MIN_SIMILARITY
+            )
+            matches = [entry_id for _, _, entry_id in scored[:limit]]
+
+        return [self.entries[entry_id] for entry_id in matches]
+
+
+def build_index(version: Optional[int] = None) -> SearchIndex:
+    names = {
+        kind: TimetableEntry.objects.order_by().values_list(column, flat=True).distinct()
+        for kind, column in SOURCES.items()
+    }
+    return SearchIndex(names, version)
+
+
+_index: Optional[SearchIndex] = None
+_lock = threading.Lock()
+
+
+def get_index() -> SearchIndex:
+    # у каждого процесса свой индекс; импорт поднимает версию кэша расписания,
+    # и первый запрос после него перестраивает индекс
+    global _index
+    version = timetable_cache.get_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = build_index(version)
+            index = _index
+    return index
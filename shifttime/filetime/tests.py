@@ -1,3 +1,1193 @@
-from django.test import TestCase
+import csv
+import json
+import logging
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+from filetime import search_index, timetable_cache, timetable_snapshot
+from filetime.benchmarks.generator import generate_workbook
+from filetime.benchmarks.merged_cells import LinearScanParser, build_merged_workbook
+from filetime.benchmarks.sheets import build_multisheet_workbook
+from filetime.models import (
+    FileTime,
+    Group,
+    ImportJob,
+    Lesson,
+    Schedule,
+    ScheduleLesson,
+    TimetableEntry,
+    get_or_create_lessons,
+    save_schedule_from_parser,
+)
+from filetime.utils.conflicts import conflict_slots, find_conflicts
+from filetime.utils.parsecache import ParseCache
+from filetime.utils.snapshot import load_snapshot, save_snapshot
+from filetime.utils.timeparser import (
+    Pair,
+    ParseCancelled,
+    ScheduleParser,
+    load_cached,
+    parse_cached,
+    parse_cell_text,
+    parse_workbook,
+)
+from filetime.views import render_week
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+isolated_storage = override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "timetable_version": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "timetable_version",
+        },
+    },
+)
+
+
+def setUpModule():
+    # строки метрик импорта не нужны в выводе тестов, assertLogs включает их сам
+    logging.getLogger("filetime.import").setLevel(logging.WARNING)
+
+
+def tearDownModule():
+    logging.getLogger("filetime.import").setLevel(logging.INFO)
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def upload_workbook(stream, start_date=date(2025, 2, 3), end_date=date(2025, 2, 9)):
+    filetime = FileTime.objects.create(
+        start_date=start_date,
+        end_date=end_date,
+        file=SimpleUploadedFile("week.xlsx", stream.getvalue()),
+    )
+    call_command("run_import_worker", "--once", stdout=StringIO())
+    return filetime
+
+
+def edit_cell(stream, row, column, value):
+    parser = ScheduleParser(stream)
+    parser.ws.cell(row=row, column=column, value=value)
+    edited = BytesIO()
+    parser.wb.save(edited)
+    return edited
+
+
+def replace_file(filetime, stream):
+    # исправленный файл для той же недели: инкрементальный импорт воркером
+    filetime.file = SimpleUploadedFile("week-fixed.xlsx", stream.getvalue())
+    filetime.save()
+    call_command("run_import_worker", "--once", stdout=StringIO())
+    return filetime.import_jobs.order_by("-pk").first()
+
+
+class MergedIndexTests(SimpleTestCase):
+    def test_index_matches_linear_scan(self):
+        stream = build_merged_workbook(days=2, groups=5)
+        indexed = ScheduleParser(stream)
+        indexed.parse_schedule()
+        stream.seek(0)
+        linear = LinearScanParser(stream)
+        linear.parse_schedule()
+
+        self.assertEqual(indexed.days, linear.days)
+        self.assertEqual(sum(len(day) for day in indexed.days), 2 * 6 * 2)
+
+    def test_only_top_left_column_carries_value(self):
+        parser = ScheduleParser(build_merged_workbook(days=1, groups=3))
+        value = "Математика Иванов И.И. каб. 201"
+        self.assertEqual(parser.get_merged_cell_value(parser.ws.cell(row=3, column=4)), None)
+        self.assertEqual(parser.get_merged_cell_value(parser.ws.cell(row=4, column=1)), "03.02.2025")
+        self.assertEqual(parser.ws.cell(row=3, column=3).value, value)
+
+
+class StreamingParserTests(SimpleTestCase):
+    def test_read_only_matches_full_mode(self):
+        stream = build_merged_workbook(days=3, groups=6)
+        full = ScheduleParser(stream)
+        full.parse_schedule()
+        stream.seek(0)
+        streaming = ScheduleParser(stream, read_only=True)
+
+        self.assertEqual(list(streaming.iter_pairs()), list(full.iter_pairs()))
+        streaming.close()
+
+    def test_read_only_index_is_drained(self):
+        streaming = ScheduleParser(build_merged_workbook(days=2, groups=4), read_only=True)
+        pairs = list(streaming.iter_pairs())
+        streaming.close()
+
+        self.assertTrue(pairs)
+        self.assertEqual(streaming.merged_index, {})
+        self.assertEqual(streaming._pending_anchors, {})
+
+    def test_read_only_index_holds_only_anchors(self):
+        streaming = ScheduleParser(generate_workbook(groups=60, weeks=4), read_only=True)
+        # до чтения строк - по записи на объединение, ячейки под ними не заводятся
+        self.assertEqual(streaming.merged_index, {})
+        self.assertEqual(len(streaming._pending_anchors), streaming.stats["merged_ranges"])
+
+        largest = 0
+        for _ in streaming.iter_value_rows():
+            largest = max(largest, len(streaming.merged_index))
+        streaming.close()
+        # только ячейки под объединениями, которые поток уже начал: не больше числа групп
+        self.assertLess(largest, 60)
+
+
+class CellTextCacheTests(SimpleTestCase):
+    def test_repeated_text_is_parsed_once(self):
+        parser = ScheduleParser(build_merged_workbook(days=2, groups=4))
+        parser.parse_schedule()
+        info = parser.cache_info()
+
+        # 6 разных текстов пар, остальные ячейки берутся из кэша
+        self.assertEqual(info.misses, 6)
+        self.assertEqual(info.hits, 2 * 6 * 2 - 6)
+
+    def test_parse_cell_text(self):
+        self.assertEqual(
+            parse_cell_text("Математика Иванов И.И.  каб. 204"),
+            ("Математика", "Иванов И.И.", "каб. 204"),
+        )
+        self.assertFalse(parse_cell_text("Классный час"))
+
+
+class PairTests(SimpleTestCase):
+    def test_dict_style_access(self):
+        pair = Pair("Математика", "ИС-1", None, 1, "Иванов И.И.", "каб. 204")
+
+        self.assertEqual(pair["teacher"], "Иванов И.И.")
+        self.assertEqual(pair.as_dict()["room"], "каб. 204")
+        with self.assertRaises(KeyError):
+            pair["name"]
+
+    def test_multi_group_header_shares_strings(self):
+        parser = ScheduleParser(build_merged_workbook(days=1, groups=2))
+        parser.ws.cell(row=2, column=3, value="ИС-1\nИС-2")
+        parser.parse_schedule()
+        first, second = list(parser.iter_pairs())[:2]
+
+        self.assertEqual((first.group, second.group), ("ИС-1", "ИС-2"))
+        self.assertIs(first.teacher, second.teacher)
+        self.assertIs(first.dt, second.dt)
+
+
+class PairIndexTests(SimpleTestCase):
+    def test_indexes_are_sorted_by_date_and_lesson(self):
+        stream = generate_workbook(groups=6, weeks=2, multi_group_ratio=0)
+        parser = ScheduleParser(stream, read_only=True)
+
+        for index in (parser.teacher_index, parser.group_index, parser.room_index):
+            for entries in index.values():
+                keys = [(pair.dt, pair.lesson_num) for pair in entries]
+                self.assertEqual(keys, sorted(keys))
+
+        pairs = parse_workbook(stream, processes=1).pairs
+        self.assertEqual(sum(map(len, parser.group_index.values())), len(pairs))
+        self.assertEqual(
+            sorted(parser.teacher_index), sorted({pair.teacher for pair in pairs})
+        )
+
+    def test_built_once_and_shared_with_parsed_schedule(self):
+        stream = build_merged_workbook(days=2, groups=4)
+        parser = ScheduleParser(stream, read_only=True)
+        self.assertIsNone(parser._indexes)
+
+        index = parser.get_teachers_schedule()
+        self.assertIs(parser.teacher_index, index)
+        self.assertEqual(list(parser.group_index), ["ИС-1", "ИС-3"])
+        self.assertEqual(
+            parse_workbook(stream, processes=1).teacher_index, index
+        )
+
+
+class ConflictTests(SimpleTestCase):
+    def test_stream_lecture_is_not_a_conflict(self):
+        pairs = parse_workbook(build_merged_workbook(days=2, groups=4), processes=1).pairs
+        self.assertEqual(find_conflicts(pairs), [])
+
+    def test_teacher_room_and_group_clashes(self):
+        dt = date(2025, 2, 3)
+        pairs = [
+            Pair("Математика", "ИС-1", dt, 1, "Иванов И.И.", "каб. 201"),
+            Pair("Физика", "ИС-2", dt, 1, "Иванов И.И.", "каб. 202"),
+            Pair("Химия", "ИС-3", dt, 1, "Петров П.П.", "каб. 202"),
+            Pair("История", "ИС-3", dt, 1, "Сидоров С.С.", "каб. 305"),
+            Pair("Физика", "ИС-2", dt, 2, "Иванов И.И.", "каб. 202"),
+        ]
+        conflicts = find_conflicts(pairs)
+
+        self.assertEqual(
+            [(c.kind, c.key, c.lesson_num, len(c.pairs)) for c in conflicts],
+            [
+                ("group", "ИС-3", 1, 2),
+                ("room", "каб. 202", 1, 2),
+                ("teacher", "Иванов И.И.", 1, 2),
+            ],
+        )
+        self.assertEqual(conflict_slots(conflicts, "teacher"), {("Иванов И.И.", dt, 1)})
+
+    def test_conflicts_are_ordered_by_lesson_number(self):
+        dt = date(2025, 2, 3)
+        pairs = [
+            Pair(subject, "ИС-1", dt, num, teacher, "")
+            for num in (10, 2, "3")
+            for subject, teacher in (("Математика", "Иванов И.И."), ("Физика", "Петров П.П."))
+        ]
+
+        self.assertEqual([c.lesson_num for c in find_conflicts(pairs)], [2, "3", 10])
+
+
+@isolated_storage
+class IngestionTests(TestCase):
+    def test_upload_keeps_every_lesson(self):
+        stream = build_merged_workbook(days=2, groups=5)
+        filetime = upload_workbook(stream)
+
+        self.assertEqual(filetime.schedules.count(), 2)
+        # лекция на поток хранится одной строкой на обе группы
+        self.assertEqual(ScheduleLesson.objects.count(), 2 * 6)
+        self.assertEqual(ScheduleLesson.groups.through.objects.count(), 2 * 6 * 2)
+        self.assertEqual(
+            list(Group.objects.values_list("name", flat=True)), ["ИС-1", "ИС-3"]
+        )
+        self.assertEqual(Lesson.objects.count(), 6)
+
+    def test_existing_lessons_are_reused(self):
+        upload_workbook(build_merged_workbook(days=1, groups=3))
+        upload_workbook(
+            build_merged_workbook(days=1, groups=3),
+            start_date=date(2025, 2, 10),
+            end_date=date(2025, 2, 16),
+        )
+
+        self.assertEqual(Lesson.objects.count(), 6)
+        self.assertEqual(Schedule.objects.count(), 2)
+
+    def test_query_count_does_not_depend_on_size(self):
+        filetime = upload_workbook(build_merged_workbook(days=1, groups=6))
+        for days, groups in ((1, 3), (3, 6)):
+            parser = ScheduleParser(build_merged_workbook(days, groups))
+            # savepoint, выборка пар, выборка групп, дни, связи m2m, пары дней,
+            # группы пар, записи API, release; все предметы и группы уже есть
+            with self.assertNumQueries(9):
+                save_schedule_from_parser(filetime, parser)
+
+
+@isolated_storage
+class ImportJobTests(TestCase):
+    def test_upload_is_queued_until_worker_runs(self):
+        filetime = FileTime.objects.create(
+            start_date=date(2025, 2, 3),
+            end_date=date(2025, 2, 9),
+            file=SimpleUploadedFile("week.xlsx", build_merged_workbook(1, 3).getvalue()),
+        )
+        job = filetime.import_jobs.get()
+        self.assertEqual(job.status, ImportJob.PENDING)
+        self.assertFalse(filetime.schedules.exists())
+
+        call_command("run_import_worker", "--once", stdout=StringIO())
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertIsNotNone(job.duration)
+        self.assertEqual(filetime.schedules.count(), 1)
+        self.assertIsNone(ImportJob.claim_next())
+
+    def test_failed_job_records_error(self):
+        filetime = FileTime.objects.create(
+            start_date=date(2025, 2, 3),
+            end_date=date(2025, 2, 9),
+            file=SimpleUploadedFile("week.xlsx", b"not a workbook"),
+        )
+        call_command("run_import_worker", "--once", stdout=StringIO())
+        job = filetime.import_jobs.get()
+
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("Traceback", job.error)
+
+    def test_requeued_job_does_not_duplicate_rows(self):
+        filetime = FileTime.objects.create(
+            start_date=date(2025, 2, 3),
+            end_date=date(2025, 2, 9),
+            file=SimpleUploadedFile("week.xlsx", build_merged_workbook(2, 3).getvalue()),
+        )
+        # строки сохранены, упал следующий этап
+        with mock.patch("filetime.models.stored_conflicts", side_effect=RuntimeError("boom")):
+            call_command("run_import_worker", "--once", stdout=StringIO())
+        job = filetime.import_jobs.get()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        counts = (
+            filetime.schedules.count(),
+            ScheduleLesson.objects.filter(schedule__filetime=filetime).count(),
+            filetime.timetable_entries.count(),
+        )
+
+        self.client.force_login(User.objects.create_superuser("admin", password="pw"))
+        self.client.post(
+            "/admin/filetime/importjob/",
+            {"action": "requeue", "_selected_action": [job.pk]},
+        )
+        call_command("run_import_worker", "--once", stdout=StringIO())
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(
+            (
+                filetime.schedules.count(),
+                ScheduleLesson.objects.filter(schedule__filetime=filetime).count(),
+                filetime.timetable_entries.count(),
+            ),
+            counts,
+        )
+        self.assertEqual((job.rows_inserted, job.rows_updated, job.rows_deleted), (0, 0, 0))
+
+    @override_settings(FILETIME_IMPORT_ASYNC=False)
+    def test_synchronous_mode_imports_in_request(self):
+        filetime = FileTime.objects.create(
+            start_date=date(2025, 2, 3),
+            end_date=date(2025, 2, 9),
+            file=SimpleUploadedFile("week.xlsx", build_merged_workbook(1, 3).getvalue()),
+        )
+
+        self.assertEqual(filetime.import_jobs.get().status, ImportJob.DONE)
+        self.assertEqual(filetime.schedules.count(), 1)
+
+    @override_settings(FILETIME_PARSE_CACHE_MAX_BYTES=0, FILETIME_IMPORT_TRACE_MEMORY=True)
+    def test_metrics_are_recorded_and_logged(self):
+        stream = build_merged_workbook(days=2, groups=3)
+        with self.assertLogs("filetime.import", level="INFO") as logs:
+            filetime = upload_workbook(stream)
+        metrics = filetime.import_jobs.get().metrics
+
+        self.assertEqual(metrics["pairs"], len(parse_workbook(stream).pairs))
+        self.assertGreater(metrics["queries"], 0)
+        self.assertGreater(metrics["merged_ranges"], 0)
+        self.assertGreater(metrics["peak_memory_kb"], 0)
+        for stage in ("total_s", "load_s", "rows_s", "regex_s", "save_s", "db_s"):
+            self.assertIn(stage, metrics)
+        self.assertIn(f"pairs={metrics['pairs']}", logs.output[0])
+
+    def test_metrics_in_admin(self):
+        filetime = upload_workbook(build_merged_workbook(days=1, groups=3))
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="pw")
+        )
+
+        changelist = self.client.get("/admin/filetime/filetime/")
+        change = self.client.get(f"/admin/filetime/filetime/{filetime.pk}/change/")
+
+        self.assertContains(changelist, "Время импорта")
+        self.assertContains(change, "Запросы к базе")
+
+    @override_settings(FILETIME_PARSER_ENGINE="native", FILETIME_PARSE_CACHE_MAX_BYTES=0)
+    def test_native_engine_setting(self):
+        stream = build_merged_workbook(days=2, groups=4)
+        filetime = upload_workbook(stream)
+
+        self.assertEqual(filetime.import_jobs.get().status, ImportJob.DONE)
+        self.assertEqual(
+            filetime.timetable_entries.count(), len(parse_workbook(stream, processes=1).pairs)
+        )
+
+    def test_conflicts_are_recorded(self):
+        wb = load_workbook(build_merged_workbook(days=1, groups=4))
+        wb.active.cell(row=3, column=5, value="Физика Иванов И.И. каб. 301")
+        stream = BytesIO()
+        wb.save(stream)
+
+        filetime = upload_workbook(stream)
+        job = filetime.import_jobs.get()
+
+        self.assertEqual(job.conflict_count, 1)
+        self.assertEqual(job.conflicts[0]["kind"], "teacher")
+        self.assertEqual(job.conflicts[0]["date"], "2025-02-03")
+        self.assertEqual(job.conflicts[0]["lesson_num"], 1)
+        self.assertIn("conflicts_s", job.metrics)
+
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="pw")
+        )
+        change = self.client.get(f"/admin/filetime/importjob/{job.pk}/change/")
+        self.assertContains(change, "Физика Иванов И.И. каб. 301")
+
+
+@isolated_storage
+class IncrementalImportTests(TestCase):
+    def stored_rows(self, filetime):
+        return sorted(
+            ScheduleLesson.objects.filter(schedule__filetime=filetime).values_list(
+                "schedule__day", "groups__name", "order", "lesson__name", "lesson__room"
+            )
+        )
+
+    def test_single_cell_correction(self):
+        filetime = upload_workbook(build_merged_workbook(days=2, groups=5))
+        ids_before = set(ScheduleLesson.objects.values_list("pk", flat=True))
+
+        stream = edit_cell(
+            build_merged_workbook(days=2, groups=5), 4, 3, "Физика Петров П.П. каб. 101"
+        )
+        job = replace_file(filetime, stream)
+
+        self.assertTrue(job.incremental)
+        # общая пара ИС-1 и ИС-3 осталась только у ИС-3, для ИС-1 новая строка
+        self.assertEqual(
+            (job.rows_inserted, job.rows_updated, job.rows_deleted), (1, 1, 0)
+        )
+        self.assertLess(ids_before, set(ScheduleLesson.objects.values_list("pk", flat=True)))
+        self.assertIn(
+            (date(2025, 2, 3), "ИС-1", 2, "Физика", "каб. 101"), self.stored_rows(filetime)
+        )
+        self.assertIn(
+            (date(2025, 2, 3), "ИС-3", 2, "Математика", "каб. 202"), self.stored_rows(filetime)
+        )
+
+    def test_result_matches_full_import(self):
+        filetime = upload_workbook(build_merged_workbook(days=3, groups=5))
+        job = replace_file(filetime, build_merged_workbook(days=2, groups=7))
+
+        # третий день удален, у оставшихся пар добавилась группа ИС-5
+        self.assertEqual(
+            (job.rows_inserted, job.rows_updated, job.rows_deleted), (0, 2 * 6, 6)
+        )
+        self.assertEqual(filetime.schedules.count(), 2)
+
+        fresh = upload_workbook(
+            build_merged_workbook(days=2, groups=7),
+            start_date=date(2025, 3, 3),
+            end_date=date(2025, 3, 9),
+        )
+        self.assertEqual(self.stored_rows(filetime), self.stored_rows(fresh))
+
+    def test_unchanged_file_changes_nothing(self):
+        filetime = upload_workbook(build_merged_workbook(days=2, groups=5))
+        job = replace_file(filetime, build_merged_workbook(days=2, groups=5))
+
+        self.assertEqual((job.rows_inserted, job.rows_updated, job.rows_deleted), (0, 0, 0))
+
+    def test_unchanged_file_with_text_lesson_numbers(self):
+        def text_numbers():
+            parser = ScheduleParser(build_merged_workbook(days=2, groups=5))
+            for (cell,) in parser.ws.iter_rows(min_row=3, min_col=2, max_col=2):
+                cell.value = str(cell.value)
+            stream = BytesIO()
+            parser.wb.save(stream)
+            return stream
+
+        filetime = upload_workbook(text_numbers())
+        job = replace_file(filetime, text_numbers())
+
+        self.assertEqual((job.rows_inserted, job.rows_updated, job.rows_deleted), (0, 0, 0))
+
+
+class ParseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_second_parse_is_served_from_cache(self):
+        cache = ParseCache(self.directory)
+        stream = build_merged_workbook(days=2, groups=5)
+
+        first = list(parse_cached(stream, cache).iter_pairs())
+        second = list(parse_cached(stream, cache).iter_pairs())
+
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertEqual(first, second)
+
+    def test_parser_version_is_part_of_key(self):
+        cache = ParseCache(self.directory)
+        cache.put("abc", 1, [])
+
+        self.assertEqual(cache.get("abc", 1), [])
+        self.assertIsNone(cache.get("abc", 2))
+
+    def test_eviction_keeps_cache_under_limit(self):
+        cache = ParseCache(self.directory, max_bytes=1)
+        pairs = list(ScheduleParser(build_merged_workbook(days=1, groups=3)).iter_pairs())
+        cache.put("old", 1, (pair.as_tuple() for pair in pairs))
+        cache.put("new", 1, (pair.as_tuple() for pair in pairs))
+
+        self.assertIsNone(cache.get("old", 1))
+        self.assertIsNone(cache.get("new", 1))
+        self.assertEqual(list(Path(self.directory).iterdir()), [])
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.workbook = self.directory / "week.xlsx"
+        self.workbook.write_bytes(build_merged_workbook(days=2, groups=4).getvalue())
+
+    def test_last_file_is_reopened_from_cache(self):
+        cache = ParseCache(self.directory / "cache")
+        parsed = parse_cached(str(self.workbook), cache)
+        save_snapshot(self.directory / "last.json", self.workbook, parsed.digest)
+
+        path, digest = load_snapshot(self.directory / "last.json")
+        reopened = load_cached(digest, cache)
+
+        self.assertEqual(path, str(self.workbook))
+        self.assertEqual(reopened.pairs, parsed.pairs)
+        self.assertEqual(reopened.digest, parsed.digest)
+
+    def test_changed_or_missing_file(self):
+        save_snapshot(self.directory / "last.json", self.workbook, "abc")
+        self.workbook.write_bytes(build_merged_workbook(days=1, groups=4).getvalue())
+        self.assertEqual(
+            load_snapshot(self.directory / "last.json"), (str(self.workbook), None)
+        )
+
+        self.workbook.unlink()
+        self.assertIsNone(load_snapshot(self.directory / "last.json"))
+        self.assertIsNone(load_snapshot(self.directory / "missing.json"))
+
+    def test_parser_import_does_not_load_openpyxl(self):
+        # окно GUI и список из снимка не ждут импорта openpyxl
+        code = "import sys, filetime.utils.timeparser; print('openpyxl' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parents[1],
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+@isolated_storage
+class TimetableApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        timetable_cache.reset_stats()
+        self.filetime = upload_workbook(build_merged_workbook(days=7, groups=3))
+
+    def test_teachers(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/teachers/")
+
+        self.assertEqual(response.json(), {"teachers": ["Иванов И.И."]})
+
+    def test_teacher_week(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/teachers/Иванов И.И./week/2025-02-05/")
+
+        data = response.json()
+        self.assertEqual((data["week_start"], data["week_end"]), ("2025-02-03", "2025-02-09"))
+        self.assertEqual(len(data["lessons"]), 7 * 6)
+        self.assertEqual(
+            data["lessons"][0],
+            {
+                "date": "2025-02-03",
+                "order": 1,
+                "subject": "Математика",
+                "group": "ИС-1",
+                "room": "каб. 201",
+            },
+        )
+
+    def test_group_week_and_conditional_get(self):
+        url = "/api/groups/ИС-1/week/2025-02-09/"
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()["lessons"]), 7 * 6)
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_entries_follow_incremental_import(self):
+        stream = edit_cell(
+            build_merged_workbook(days=7, groups=3), 3, 3, "Физика Петров П.П. каб. 101"
+        )
+        replace_file(self.filetime, stream)
+
+        response = self.client.get("/api/teachers/Петров П.П./week/2025-02-03/")
+        self.assertEqual(len(response.json()["lessons"]), 1)
+        self.assertEqual(
+            TimetableEntry.objects.count(), ScheduleLesson.groups.through.objects.count()
+        )
+
+    def test_repeated_week_is_served_from_cache(self):
+        url = "/api/teachers/Иванов И.И./week/2025-02-05/"
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(timetable_cache.stats()["hits"], 1)
+        self.assertEqual(timetable_cache.stats()["misses"], 1)
+
+    def test_version_survives_cache_culling(self):
+        version = timetable_cache.get_version()
+        for number in range(1000):
+            cache.set(f"week-{number}", b"{}")
+
+        self.assertEqual(timetable_cache.get_version(), version)
+
+    def test_import_invalidates_cached_weeks(self):
+        url = "/api/teachers/Иванов И.И./week/2025-02-05/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(len(self.client.get("/api/teachers/").json()["teachers"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.filetime.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["lessons"], [])
+        self.assertEqual(self.client.get("/api/teachers/").json()["teachers"], [])
+
+    def test_version_changes_after_commit(self):
+        version = timetable_cache.get_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.filetime.delete()
+        # до commit запросы еще видят старые строки и кэшируют их под старой версией
+        self.assertEqual(timetable_cache.get_version(), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(timetable_cache.get_version(), version)
+
+    def test_cache_stats_requires_staff(self):
+        self.assertEqual(self.client.get("/api/stats/cache/").status_code, 302)
+        staff = User.objects.create_user("admin", password="pw", is_staff=True)
+        self.client.force_login(staff)
+
+        self.assertIn("hit_ratio", self.client.get("/api/stats/cache/").json())
+
+    def test_invalid_date_is_not_found(self):
+        response = self.client.get("/api/groups/ИС-1/week/2025-13-40/")
+        self.assertEqual(response.status_code, 404)
+
+
+@isolated_storage
+class ExportTests(TestCase):
+    def setUp(self):
+        # поток ИС-1 + ИС-3 у одного преподавателя в одном кабинете
+        upload_workbook(build_merged_workbook(days=7, groups=4))
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_teacher_ics(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/teachers/Иванов И.И./export.ics")
+            content = self.content(response)
+
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertIn("attachment", response["Content-Disposition"])
+        # одно событие на пару потока, а не на каждую группу
+        self.assertEqual(content.count("BEGIN:VEVENT"), 7 * 6)
+        self.assertIn("DTSTART:20250203T083000\r\n", content)
+        self.assertIn("DESCRIPTION:Пара 1: ИС-1\\, ИС-3\r\n", content)
+        self.assertTrue(content.endswith("END:VCALENDAR\r\n"))
+        for line in content.split("\r\n"):
+            self.assertLessEqual(len(line.encode("utf-8")), 75)
+
+    def test_group_csv_with_date_range(self):
+        response = self.client.get(
+            "/api/groups/ИС-3/export.csv", {"start": "2025-02-04", "end": "2025-02-05"}
+        )
+        rows = list(csv.reader(StringIO(self.content(response).lstrip("\ufeff"))))
+
+        self.assertEqual(len(rows), 1 + 2 * 6)
+        self.assertEqual(
+            rows[1],
+            ["2025-02-04", "1", "08:30", "10:00", "Математика", "Иванов И.И.", "ИС-3", "каб. 201"],
+        )
+
+    def test_invalid_range_and_format(self):
+        response = self.client.get("/api/groups/ИС-1/export.csv", {"start": "04.02.2025"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/groups/ИС-1/export.pdf").status_code, 404)
+
+    def test_export_everyone(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                "export_timetables", directory, "--kind", "group", "--format", "csv",
+                stdout=StringIO(),
+            )
+            files = sorted(path.name for path in Path(directory).iterdir())
+            content = (Path(directory) / "ИС-1.csv").read_text(encoding="utf-8-sig")
+
+        self.assertEqual(files, ["ИС-1.csv", "ИС-3.csv"])
+        self.assertEqual(len(content.splitlines()), 1 + 7 * 6)
+
+
+class SearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = search_index.SearchIndex({
+            "teacher": ["Иванов И.И.", "Иванова А.С.", "Фёдоров Ф.Ф.", "Петров П.П."],
+            "group": ["ИС-1", "ИС-12", "ПИ-3"],
+            "room": ["каб. 201", "каб. 12", ""],
+        })
+
+    def names(self, query, **kwargs):
+        return [name for _, name in self.index.search(query, **kwargs)]
+
+    def test_normalize(self):
+        self.assertEqual(search_index.normalize("  Фёдоров  Ф.Ф. "), "федоров ф ф")
+        self.assertEqual(search_index.normalize("ИС-1"), "ис 1")
+
+    def test_prefix_match_is_case_and_punctuation_insensitive(self):
+        self.assertEqual(self.names("иВаН"), ["Иванов И.И.", "Иванова А.С."])
+        self.assertEqual(self.names("Иванов И И"), ["Иванов И.И."])
+        self.assertEqual(self.names("и. иванов"), ["Иванов И.И."])
+        self.assertEqual(self.names("федор"), ["Фёдоров Ф.Ф."])
+        self.assertEqual(self.names("ёлка"), [])
+
+    def test_kinds_and_limit(self):
+        self.assertEqual(self.names("ис 1", kinds=["group"]), ["ИС-1", "ИС-12"])
+        self.assertEqual(self.names("12", kinds=["room"]), ["каб. 12"])
+        self.assertEqual(self.names("иван", limit=1), ["Иванов И.И."])
+
+    def test_typo_falls_back_to_trigrams(self):
+        self.assertEqual(self.names("петорв", kinds=["teacher"]), ["Петров П.П."])
+        self.assertEqual(self.names(" .- "), [])
+
+
+@isolated_storage
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.filetime = upload_workbook(build_merged_workbook(days=7, groups=4))
+
+    def test_autocomplete_without_queries(self):
+        self.client.get("/api/search/", {"q": "и"})
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/search/", {"q": "ИВАНОВ и."})
+
+        self.assertEqual(
+            response.json(), {"results": [{"kind": "teacher", "name": "Иванов И.И."}]}
+        )
+        response = self.client.get("/api/search/", {"q": "ис", "kind": ["group", "room"]})
+        self.assertEqual(
+            [item["name"] for item in response.json()["results"]], ["ИС-1", "ИС-3"]
+        )
+
+    def test_index_is_rebuilt_after_import(self):
+        self.assertEqual(self.client.get("/api/search/", {"q": "петров"}).json()["results"], [])
+
+        stream = edit_cell(
+            build_merged_workbook(days=7, groups=4), 3, 3, "Физика Петров П.П. каб. 101"
+        )
+        replace_file(self.filetime, stream)
+
+        response = self.client.get("/api/search/", {"q": "петров"})
+        self.assertEqual(response.json()["results"], [{"kind": "teacher", "name": "Петров П.П."}])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get("/api/search/", {"q": "и", "kind": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/search/", {"q": "и", "limit": "a"}).status_code, 400)
+
+
+@isolated_storage
+class TimetableSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # окно снимка считается от сегодняшнего дня, тестовая неделя - февраль 2025
+        patcher = mock.patch("django.utils.timezone.localdate", return_value=date(2025, 2, 5))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: timetable_snapshot.snapshot_path().unlink(missing_ok=True))
+        self.filetime = upload_workbook(build_merged_workbook(days=7, groups=4))
+
+    def test_weeks_are_served_from_snapshot(self):
+        for kind, name in (("teacher", "Иванов И.И."), ("group", "ИС-3"), ("group", "ИС-9")):
+            url = f"/api/{kind}s/{name}/week/2025-02-05/"
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.content, render_week(kind, name, date(2025, 2, 3))["body"])
+
+        snapshot = timetable_snapshot.current()
+        self.assertEqual(snapshot.entries, TimetableEntry.objects.count())
+        self.assertTrue(snapshot.covers(date(2025, 1, 27), date(2025, 4, 6)))
+
+    def test_weeks_outside_snapshot_read_database(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/groups/ИС-1/week/2025-06-02/")
+        self.assertEqual(response.json()["lessons"], [])
+
+    def test_import_swaps_snapshot(self):
+        old = timetable_snapshot.current()
+        stream = edit_cell(
+            build_merged_workbook(days=7, groups=4), 3, 3, "Физика Петров П.П. каб. 101"
+        )
+        replace_file(self.filetime, stream)
+
+        new = timetable_snapshot.current()
+        self.assertIsNot(new, old)
+        self.assertEqual(new.version, old.version + 1)
+        response = self.client.get("/api/teachers/Петров П.П./week/2025-02-03/")
+        self.assertEqual(len(response.json()["lessons"]), 1)
+        # старое отображение дочитывается после замены файла
+        old_week = list(old.week("teacher", "Иванов И.И.", date(2025, 2, 3), date(2025, 2, 9)))
+        self.assertEqual(len(old_week), 7 * 6 * 2)
+
+    def test_delete_rewrites_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.filetime.delete()
+
+        self.assertEqual(timetable_snapshot.current().entries, 0)
+        response = self.client.get("/api/groups/ИС-1/week/2025-02-05/")
+        self.assertEqual(response.json()["lessons"], [])
+
+    def test_refresh_when_week_changes(self):
+        self.assertFalse(timetable_snapshot.refresh_if_stale(date(2025, 2, 9)))
+        self.assertTrue(timetable_snapshot.refresh_if_stale(date(2025, 2, 10)))
+        self.assertFalse(timetable_snapshot.current().covers(date(2025, 1, 27), date(2025, 2, 2)))
+
+
+class IndexUsageTests(TestCase):
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"SEARCH \w+ USING (COVERING )?INDEX ({index_name})")
+
+    def test_lessons_by_teacher(self):
+        self.assertUsesIndex(
+            Lesson.objects.filter(teacher__in=["Иванов И.И."]),
+            # SQLite пересоздает таблицу и хранит UniqueConstraint как autoindex
+            "lesson_teacher_name_room|sqlite_autoindex_filetime_lesson_1",
+        )
+
+    def test_schedule_by_day(self):
+        self.assertUsesIndex(Schedule.objects.filter(day=date(2025, 2, 3)), "schedule_day")
+
+    def test_schedule_lessons_by_order(self):
+        self.assertUsesIndex(
+            ScheduleLesson.objects.filter(schedule_id=1, order=2),
+            "schedulelesson_order",
+        )
+
+    def test_timetable_by_group(self):
+        self.assertUsesIndex(
+            TimetableEntry.objects.filter(
+                group_id=1, date__range=(date(2025, 2, 3), date(2025, 2, 9))
+            ),
+            "timetable_group_week",
+        )
+
+    def test_filetime_overlap(self):
+        self.assertUsesIndex(
+            FileTime.objects.filter(
+                start_date__lt=date(2025, 2, 9), end_date__gt=date(2025, 2, 3)
+            ),
+            "filetime_date_range",
+        )
+
+    def test_lesson_upsert_does_not_duplicate(self):
+        Lesson.objects.create(name="Математика", teacher="Иванов И.И.", room="каб. 201")
+        lessons = get_or_create_lessons(
+            [("Математика", "Иванов И.И.", "каб. 201"), ("Физика", "Петров П.П.", "")]
+        )
+
+        self.assertEqual(Lesson.objects.count(), 2)
+        self.assertTrue(all(lesson.pk for lesson in lessons.values()))
+
+
+class MultiSheetTests(SimpleTestCase):
+    def test_every_sheet_is_parsed_with_its_own_groups(self):
+        stream = build_multisheet_workbook(sheets=3, days=1, groups=3)
+        pairs = parse_workbook(stream, processes=1).pairs
+
+        self.assertEqual([pair.group for pair in pairs[::6]], ["К1-1", "К2-1", "К3-1"])
+
+    def test_process_pool_matches_serial_parse(self):
+        stream = build_multisheet_workbook(sheets=3, days=1, groups=5)
+
+        self.assertEqual(
+            parse_workbook(stream, processes=2).pairs,
+            parse_workbook(stream, processes=1).pairs,
+        )
+
+    def test_selected_sheets(self):
+        stream = build_multisheet_workbook(sheets=3, days=1, groups=3)
+        pairs = parse_workbook(stream, sheets=["Курс 2"]).pairs
+
+        self.assertEqual({pair.group for pair in pairs}, {"К2-1"})
+
+    def test_progress_is_reported(self):
+        stream = build_multisheet_workbook(sheets=2, days=2, groups=3)
+        for processes in (1, 2):
+            reported = []
+            parsed = parse_workbook(stream, processes=processes, progress=reported.append)
+
+            self.assertEqual(reported, sorted(reported))
+            self.assertEqual(reported[-1], 1)
+            self.assertEqual(parsed.pairs, parse_workbook(stream, processes=1).pairs)
+
+    def test_progress_callback_cancels_parse(self):
+        stream = build_multisheet_workbook(sheets=3, days=2, groups=3)
+        reported = []
+
+        def progress(done):
+            reported.append(done)
+            raise ParseCancelled()
+
+        with self.assertRaises(ParseCancelled):
+            parse_workbook(stream, processes=1, progress=progress)
+        self.assertEqual(len(reported), 1)
+
+
+class NativeEngineTests(SimpleTestCase):
+    def test_same_pairs_as_openpyxl(self):
+        streams = [
+            generate_workbook(groups=12, weeks=2),
+            build_multisheet_workbook(sheets=3, days=2, groups=5),
+            build_merged_workbook(days=3, groups=6),
+        ]
+        for stream in streams:
+            expected = parse_workbook(stream, processes=1)
+            native = parse_workbook(stream, processes=1, engine="native")
+
+            self.assertEqual(native.pairs, expected.pairs)
+            self.assertEqual(native.stats["merged_ranges"], expected.stats["merged_ranges"])
+
+    def test_cell_values_match_openpyxl(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Лист"
+        ws.append(["Дата", 1, 2.5, True, "каб. 204"])
+        ws.append([])
+        ws.append([datetime(2025, 2, 3), "=A1", None, CellRichText("Мате", TextBlock(InlineFont(b=True), "матика"))])
+        ws.cell(row=6, column=7, value="конец")
+        ws.merge_cells("A4:B5")
+        stream = BytesIO()
+        wb.save(stream)
+
+        expected = ScheduleParser(stream, read_only=True)
+        native = ScheduleParser(stream, engine="native")
+        rows = [
+            list(parser.ws.iter_rows(min_row=1, max_row=parser.ws.max_row, values_only=True))
+            for parser in (expected, native)
+        ]
+
+        self.assertEqual(rows[1], rows[0])
+        self.assertEqual(rows[1][2][3], "Математика")
+        self.assertEqual(list(native.iter_merged_ranges()), [(1, 4, 2, 5)])
+        self.assertEqual(native.wb.sheetnames, ["Лист"])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            ScheduleParser(build_merged_workbook(days=1, groups=2), engine="xlrd")
+
+
+@isolated_storage
+class ImportTimetablesCommandTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write_workbook(self, name, start, days=5):
+        stream = build_merged_workbook(days=days, groups=3, start=start)
+        (self.directory / name).write_bytes(stream.getvalue())
+
+    def test_directory_import(self):
+        self.write_workbook("week1.xlsx", date(2025, 2, 3))
+        self.write_workbook("week2.xlsx", date(2025, 2, 10))
+        self.write_workbook("week3-overlap.xlsx", date(2025, 2, 11), days=2)
+        (self.directory / "broken.xlsx").write_bytes(b"not a workbook")
+
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_timetables", str(self.directory), processes=2, stdout=out, stderr=err
+        )
+
+        dates = list(FileTime.objects.order_by("start_date").values_list("start_date", "end_date"))
+        self.assertEqual(
+            dates,
+            [(date(2025, 2, 3), date(2025, 2, 9)), (date(2025, 2, 10), date(2025, 2, 16))],
+        )
+        self.assertEqual(ScheduleLesson.objects.count(), 2 * 5 * 6)
+        self.assertFalse(ImportJob.objects.exclude(status=ImportJob.DONE).exists())
+        self.assertIn("broken.xlsx: ошибка разбора", err.getvalue())
+        self.assertIn("импортировано 2, пропущено 1, ошибок 1", out.getvalue())
+
+    def test_explicit_dates(self):
+        self.write_workbook("week.xlsx", date(2025, 2, 3))
+        call_command(
+            "import_timetables", str(self.directory),
+            start_date="2025-02-01", end_date="2025-02-28", stdout=StringIO(),
+        )
+
+        filetime = FileTime.objects.get()
+        self.assertEqual((filetime.start_date, filetime.end_date), (date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertEqual(filetime.schedules.count(), 5)
+
+
+@isolated_storage
+class AdminScalingTests(TestCase):
+    changelists = (
+        "/admin/filetime/filetime/",
+        "/admin/filetime/schedule/",
+        "/admin/filetime/schedulelesson/",
+        "/admin/filetime/importjob/",
+        "/admin/filetime/lesson/",
+    )
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="pw"))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def upload_weeks(self, weeks, groups, first_week=0):
+        for week in range(first_week, first_week + weeks):
+            start = date(2025, 2, 3) + timedelta(weeks=week)
+            upload_workbook(
+                build_merged_workbook(days=5, groups=groups, start=start),
+                start_date=start,
+                end_date=start + timedelta(days=6),
+            )
+
+    def test_changelist_queries_do_not_grow_with_data(self):
+        self.upload_weeks(weeks=1, groups=3)
+        small = [self.count_queries(url) for url in self.changelists]
+
+        self.upload_weeks(weeks=4, groups=8, first_week=1)
+        large = [self.count_queries(url) for url in self.changelists]
+
+        self.assertEqual(small, large)
+
+    def test_inline_is_paginated(self):
+        upload_workbook(
+            generate_workbook(groups=10, days_per_week=1, merged_density=0, empty_ratio=0)
+        )
+        schedule = Schedule.objects.get()
+        self.assertGreater(schedule.schedulelesson_set.count(), 50)
+        url = f"/admin/filetime/schedule/{schedule.pk}/change/"
+
+        first = self.client.get(url)
+        last = self.client.get(url + "?lessons_page=2")
+
+        self.assertContains(first, "?lessons_page=2")
+        self.assertEqual(
+            len(first.context["inline_admin_formsets"][0].formset.forms), 50
+        )
+        self.assertEqual(
+            len(last.context["inline_admin_formsets"][0].formset.forms),
+            schedule.schedulelesson_set.count() - 50,
+        )
+
+    def test_imported_data_is_read_only(self):
+        self.upload_weeks(weeks=1, groups=3)
+        schedule_lesson = ScheduleLesson.objects.select_related("lesson").first()
+        url = f"/admin/filetime/schedulelesson/{schedule_lesson.pk}/change/"
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.post(url, {"order": 7}).status_code, 403)
+        self.assertEqual(self.client.get("/admin/filetime/lesson/add/").status_code, 403)
+        response = self.client.post(
+            f"/admin/filetime/lesson/{schedule_lesson.lesson.pk}/delete/", {"post": "yes"}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            TimetableEntry.objects.filter(schedule_lesson=schedule_lesson).count(),
+            schedule_lesson.groups.count(),
+        )
+
+    def test_filetime_schedules_are_read_only(self):
+        self.upload_weeks(weeks=1, groups=3)
+        filetime = FileTime.objects.get()
+        other = Schedule.objects.create(day=date(2025, 3, 3))
+        url = f"/admin/filetime/filetime/{filetime.pk}/change/"
+
+        response = self.client.get(url)
+        self.assertNotIn("schedules", response.context["adminform"].form.fields)
+        self.assertContains(response, f"?filetime__id__exact={filetime.pk}")
+        response = self.client.post(url, {
+            "start_date": "2025-02-03", "end_date": "2025-02-09", "schedules": [other.pk],
+            "import_jobs-TOTAL_FORMS": 0, "import_jobs-INITIAL_FORMS": 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(filetime.schedules.count(), 5)
+
+        response = self.client.get(f"/admin/filetime/schedule/?filetime__id__exact={filetime.pk}")
+        self.assertEqual(response.context["cl"].result_count, 5)
+
+    def test_import_jobs_are_not_added_by_hand(self):
+        self.assertEqual(self.client.get("/admin/filetime/importjob/add/").status_code, 403)
+        self.assertEqual(
+            self.client.post("/admin/filetime/importjob/add/", {"status": "pending"}).status_code,
+            403,
+        )
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_counts_are_annotated(self):
+        self.upload_weeks(weeks=1, groups=3)
+        response = self.client.get("/admin/filetime/filetime/")
+        filetime = response.context["cl"].result_list[0]
+
+        self.assertEqual(filetime.schedule_count, 5)
+        self.assertEqual(filetime.lesson_count, TimetableEntry.objects.count())
+
+
+class GeneratorTests(SimpleTestCase):
+    def test_same_seed_gives_same_schedule(self):
+        first = parse_workbook(generate_workbook(groups=6, seed=3), processes=1).pairs
+        second = parse_workbook(generate_workbook(groups=6, seed=3), processes=1).pairs
+
+        self.assertTrue(first)
+        self.assertEqual(first, second)
+
+    def test_shape(self):
+        stream = generate_workbook(
+            groups=4, weeks=2, days_per_week=5, lessons_per_day=3,
+            merged_density=0, multi_group_ratio=0, empty_ratio=0,
+        )
+        pairs = parse_workbook(stream, processes=1).pairs
+
+        self.assertEqual(len(pairs), 4 * 2 * 5 * 3)
+        self.assertEqual({pair.group for pair in pairs}, {"ИС-1", "ИС-2", "ИС-3", "ИС-4"})
+
+    def test_shared_columns_expand_to_several_groups(self):
+        stream = generate_workbook(groups=4, multi_group_ratio=1, empty_ratio=0)
+        groups = {pair.group for pair in parse_workbook(stream, processes=1).pairs}
+
+        self.assertEqual(len(groups), 8)
+
+
+@isolated_storage
+class BenchmarkCommandTests(TestCase):
+    def test_regression_against_baseline(self):
+        baseline = Path(tempfile.mkdtemp()) / "baseline.json"
+        self.addCleanup(shutil.rmtree, baseline.parent, ignore_errors=True)
+
+        call_command(
+            "benchmark", sizes=["small"], repeat=1, baseline=baseline,
+            save_baseline=True, stdout=StringIO(),
+        )
+        data = json.loads(baseline.read_text())
+        self.assertGreater(data["small"]["pairs"], 0)
+
+        data["small"]["ingest_queries"] = 1
+        baseline.write_text(json.dumps(data))
+        with self.assertRaisesMessage(CommandError, "small.ingest_queries"):
+            call_command(
+                "benchmark", sizes=["small"], repeat=1, baseline=baseline, stdout=StringIO(),
+            )
+        self.assertFalse(FileTime.objects.exists())
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import date
+from typing import Any, Callable, Dict
+
+from django.core.cache import cache, caches
+
+# отдельный кэш только для версии: очистка переполненного default ее не удаляет
+VERSION_CACHE = "timetable_version"
+VERSION_KEY = "filetime:timetable:version"
+
+Rendered = Dict[str, Any]
+
+# попадания считает каждый процесс у себя: запись в общий кэш на каждое чтение
+# дороже самого чтения, а incr файлового кэша не атомарен
+_counts: Counter = Counter()
+_counts_lock = threading.Lock()
+
+
+def get_version() -> int:
+    version_cache = caches[VERSION_CACHE]
+    version = version_cache.get(VERSION_KEY)
+    if version is None:
+        # начальная версия от часов: если кэш версии все же очищен, номер не
+        # повторяется, и индекс поиска в памяти процессов (search_index) перестраивается
+        initial = time.time_ns() // 1000
+        version_cache.add(VERSION_KEY, initial, timeout=None)
+        version = version_cache.get(VERSION_KEY, initial)
+    return version
+
+
+def bump_version() -> None:
+    # старые ключи не удаляются, а перестают читаться и вытесняются по таймауту
+    try:
+        caches[VERSION_CACHE].incr(VERSION_KEY)
+    except ValueError:
+        # ключа нет - новая начальная версия уже отличается от прежних
+        get_version()
+
+
+def count(key: str) -> None:
+    with _counts_lock:
+        _counts[key] += 1
+
+
+def reset_stats() -> None:
+    with _counts_lock:
+        _counts.clear()
+
+
+def week_key(kind: str, name: str, week_start: date) -> str:
+    # ФИО и группы содержат пробелы и кириллицу, в ключ идет хэш
+    digest = hashlib.md5(name.encode("utf-8"), usedforsecurity=False).hexdigest()
+    return f"filetime:timetable:v{get_version()}:{kind}:{digest}:{week_start.isoformat()}"
+
+
+def list_key(kind: str) -> str:
+    return f"filetime:timetable:v{get_version()}:{kind}"
+
+
+def get_or_render(key: str, render: Callable[[], Rendered]) -> Rendered:
+    rendered = cache.get(key)
+    if rendered is not None:
+        count("hits")
+        return rendered
+
+    count("misses")
+    rendered = render()
+    cache.set(key, rendered)
+    return rendered
+
+
+def stats() -> Dict[str, Any]:
+    # счетчики процесса, который ответил на запрос
+    with _counts_lock:
+        hits, misses = _counts["hits"], _counts["misses"]
+    return {
+        "version": caches[VERSION_CACHE].get(VERSION_KEY),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0,
+    }
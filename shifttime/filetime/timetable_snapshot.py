@@ -0,0 +1,289 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+# Неизменяемый снимок записей TimetableEntry текущих недель. Файл пишется целиком
+# после каждого импорта и заменяется через os.replace; процессы веб-сервера
+# читают его через mmap: одна копия в кэше страниц ОС, массивы читаются на месте.
+#
+# Разметка: заголовок, затем секции с выравниванием 8 байт
+#   смещения строк (S + 1)      uint32, в блоке строк
+#   date, order, subject, teacher, group, room, updated_at - по массиву на колонку,
+#   записи отсортированы по (группа, дата, пара, преподаватель)
+#   teacher_order (N)           номера записей по (преподаватель, дата, пара, группа)
+#   ключи преподавателей (T), смещения (T + 1) в teacher_order
+#   ключи групп (G), смещения (G + 1) в записях
+#   блок строк utf-8, строки отсортированы, поэтому номера строк упорядочены как имена
+
+MAGIC = b"FTSNAP1" + sys.byteorder[0].encode()
+# magic, версия, первый и последний день (ordinal), строк, записей, преподавателей,
+# групп, байт в блоке строк
+HEADER = struct.Struct("=8sQIIIIIII")
+ALIGN = 8
+SNAPSHOT_NAME = "timetable.snapshot"
+
+Row = Tuple[str, date, int, str, str, str, datetime]
+
+
+def snapshot_path() -> Path:
+    return Path(settings.MEDIA_ROOT) / SNAPSHOT_NAME
+
+
+def snapshot_window(today: Optional[date] = None) -> Tuple[date, date]:
+    before, after = settings.FILETIME_SNAPSHOT_WEEKS
+    today = today or timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    return week_start - timedelta(weeks=before), week_start + timedelta(weeks=after + 1, days=-1)
+
+
+def padding(size: int) -> bytes:
+    return b"\0" * (-size % ALIGN)
+
+
+def build_snapshot(rows: List[Row], start: date, end: date, version: int) -> bytes:
+    # rows: (группа, дата, пара, преподаватель, предмет, кабинет, updated_at)
+    strings = sorted({value for row in rows for value in (row[0], row[3], row[4], row[5])})
+    string_ids = {value: index for index, value in enumerate(strings)}
+    encoded = [value.encode("utf-8") for value in strings]
+    string_offsets = array("I", [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+    blob = b"".join(encoded)
+
+    records = sorted(
+        (
+            string_ids[group], day.toordinal(), order, string_ids[teacher],
+            string_ids[subject], string_ids[room], int(updated_at.timestamp()),
+        )
+        for group, day, order, teacher, subject, room, updated_at in rows
+    )
+    groups = array("I", (record[0] for record in records))
+    dates = array("I", (record[1] for record in records))
+    orders = array("H", (record[2] for record in records))
+    teachers = array("I", (record[3] for record in records))
+    subjects = array("I", (record[4] for record in records))
+    rooms = array("I", (record[5] for record in records))
+    updated = array("q", (record[6] for record in records))
+    teacher_order = array("I", sorted(
+        range(len(records)),
+        key=lambda index: (teachers[index], dates[index], orders[index], groups[index]),
+    ))
+
+    def key_table(ids: Any) -> Tuple[array, array]:
+        keys, offsets = array("I"), array("I")
+        for position, string_id in enumerate(ids):
+            if not keys or keys[-1] != string_id:
+                keys.append(string_id)
+                offsets.append(position)
+        offsets.append(len(ids))
+        return keys, offsets
+
+    teacher_keys, teacher_offsets = key_table([teachers[index] for index in teacher_order])
+    group_keys, group_offsets = key_table(groups)
+
+    parts = [HEADER.pack(
+        MAGIC, version, start.toordinal(), end.toordinal(), len(strings), len(records),
+        len(teacher_keys), len(group_keys), len(blob),
+    )]
+    parts.append(padding(HEADER.size))
+    for section in (
+        string_offsets, dates, orders, subjects, teachers, groups, rooms, updated,
+        teacher_order, teacher_keys, teacher_offsets, group_keys, group_offsets,
+    ):
+        data = section.tobytes()
+        parts += [data, padding(len(data))]
+    parts.append(blob)
+    return b"".join(parts)
+
+
+def read_version(path: Path) -> int:
+    try:
+        with open(path, "rb") as src:
+            header = src.read(HEADER.size)
+    except OSError:
+        return 0
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return 0
+    return HEADER.unpack(header)[1]
+
+
+def write_snapshot(path: Optional[Path] = None, today: Optional[date] = None) -> Path:
+    # models импортирует этот модуль
+    from filetime.models import TimetableEntry
+
+    path = path or snapshot_path()
+    start, end = snapshot_window(today)
+    rows: List[Row] = list(
+        TimetableEntry.objects.filter(date__range=(start, end)).order_by().values_list(
+            "group__name", "date", "order", "teacher", "subject", "room", "updated_at"
+        )
+    )
+    data = build_snapshot(rows, start, end, read_version(path) + 1)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            dst.write(data)
+        # читатели видят либо старый файл целиком, либо новый
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def refresh(today: Optional[date] = None) -> bool:
+    if settings.FILETIME_SNAPSHOT_WEEKS is None:
+        return False
+    try:
+        write_snapshot(today=today)
+    except OSError:
+        # устаревший снимок хуже отсутствующего: без него API читает базу
+        try:
+            os.unlink(snapshot_path())
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def refresh_if_stale(today: Optional[date] = None) -> bool:
+    # неделя сменилась или снимка еще нет: окно сдвигается и без импортов
+    if settings.FILETIME_SNAPSHOT_WEEKS is None:
+        return False
+    try:
+        with open(snapshot_path(), "rb") as src:
+            start = HEADER.unpack(src.read(HEADER.size))[2]
+    except (OSError, struct.error):
+        start = None
+    if start == snapshot_window(today)[0].toordinal():
+        return False
+    return refresh(today)
+
+
+class TimetableSnapshot:
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as src:
+            stat = os.fstat(src.fileno())
+            self.file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, self.version, self.start, self.end, strings, entries,
+            teachers, groups, blob_size,
+        ) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не снимок расписания")
+
+        view = memoryview(self._map)
+        offset = HEADER.size + len(padding(HEADER.size))
+
+        def section(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * struct.calcsize(fmt)
+            data = view[offset:offset + size].cast(fmt)
+            offset += size + len(padding(size))
+            return data
+
+        self._string_offsets = section("I", strings + 1)
+        self._dates = section("I", entries)
+        self._orders = section("H", entries)
+        self._subjects = section("I", entries)
+        self._teachers = section("I", entries)
+        self._groups = section("I", entries)
+        self._rooms = section("I", entries)
+        self._updated = section("q", entries)
+        self._teacher_order = section("I", entries)
+        self._teacher_keys = section("I", teachers)
+        self._teacher_offsets = section("I", teachers + 1)
+        self._group_keys = section("I", groups)
+        self._group_offsets = section("I", groups + 1)
+        self._blob_start = offset
+        if offset + blob_size != len(self._map):
+            raise ValueError(f"{path}: снимок расписания обрезан")
+        self.entries = entries
+
+    def string_bytes(self, string_id: int) -> bytes:
+        start = self._blob_start + self._string_offsets[string_id]
+        return self._map[start:self._blob_start + self._string_offsets[string_id + 1]]
+
+    def string(self, string_id: int) -> str:
+        return self.string_bytes(string_id).decode("utf-8")
+
+    def covers(self, week_start: date, week_end: date) -> bool:
+        return self.start <= week_start.toordinal() and week_end.toordinal() <= self.end
+
+    def key_range(self, keys: memoryview, offsets: memoryview, name: str) -> Tuple[int, int]:
+        encoded = name.encode("utf-8")
+        position = bisect_left(keys, encoded, key=self.string_bytes)
+        if position < len(keys) and self.string_bytes(keys[position]) == encoded:
+            return offsets[position], offsets[position + 1]
+        return 0, 0
+
+    def week(self, kind: str, name: str, week_start: date, week_end: date) -> Iterator[Dict[str, Any]]:
+        # строки в формате values() TimetableEntry, как для week_payload во views
+        start, end = week_start.toordinal(), week_end.toordinal()
+        if kind == "teacher":
+            low, high = self.key_range(self._teacher_keys, self._teacher_offsets, name)
+            date_of = self._dates.__getitem__
+            low = bisect_left(self._teacher_order, start, low, high, key=date_of)
+            high = bisect_right(self._teacher_order, end, low, high, key=date_of)
+            indexes: Any = self._teacher_order[low:high]
+        else:
+            low, high = self.key_range(self._group_keys, self._group_offsets, name)
+            low = bisect_left(self._dates, start, low, high)
+            high = bisect_right(self._dates, end, low, high)
+            indexes = range(low, high)
+
+        for index in indexes:
+            yield {
+                "date": date.fromordinal(self._dates[index]),
+                "order": self._orders[index],
+                "subject": self.string(self._subjects[index]),
+                "teacher": self.string(self._teachers[index]),
+                "group__name": self.string(self._groups[index]),
+                "room": self.string(self._rooms[index]),
+                "updated_at": datetime.fromtimestamp(self._updated[index], dt_timezone.utc),
+            }
+
+
+_snapshot: Optional[TimetableSnapshot] = None
+_lock = threading.Lock()
+
+
+def current() -> Optional[TimetableSnapshot]:
+    # stat на запрос: новый файл после os.replace - другой inode, процесс переключается
+    # на него сам; старое отображение живет, пока его дочитывают другие потоки
+    global _snapshot
+    if settings.FILETIME_SNAPSHOT_WEEKS is None:
+        return None
+    try:
+        stat = os.stat(snapshot_path())
+    except OSError:
+        _snapshot = None
+        return None
+    file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    snapshot = _snapshot
+    if snapshot is None or snapshot.file_key != file_key:
+        with _lock:
+            if _snapshot is None or _snapshot.file_key != file_key:
+                try:
+                    _snapshot = TimetableSnapshot(snapshot_path())
+                except (OSError, TypeError, ValueError, struct.error):
+                    _snapshot = None
+            snapshot = _snapshot
+    return snapshot
@@ -0,0 +1,55 @@
+from datetime import date
+
+from django.urls import path, register_converter
+
+from filetime import views
+
+
+class IsoDateConverter:
+    regex = r"\d{4}-\d{2}-\d{2}"
+
+    def to_python(self, value: str) -> date:
+        return date.fromisoformat(value)
+
+    def to_url(self, value: date) -> str:
+        return value.isoformat()
+
+
+class ExportFormatConverter:
+    regex = r"ics|csv"
+
+    def to_python(self, value: str) -> str:
+        return value
+
+    def to_url(self, value: str) -> str:
+        return value
+
+
+register_converter(IsoDateConverter, "isodate")
+register_converter(ExportFormatConverter, "exportformat")
+
+urlpatterns = [
+    path("teachers/", views.teachers, name="api-teachers"),
+    path(
+        "teachers/<str:name>/week/<isodate:day>/",
+        views.teacher_week,
+        name="api-teacher-week",
+    ),
+    path(
+        "groups/<str:group>/week/<isodate:day>/",
+        views.group_week,
+        name="api-group-week",
+    ),
+    path(
+        "teachers/<str:name>/export.<exportformat:fmt>",
+        views.teacher_export,
+        name="api-teacher-export",
+    ),
+    path(
+        "groups/<str:group>/export.<exportformat:fmt>",
+        views.group_export,
+        name="api-group-export",
+    ),
+    path("search/", views.autocomplete, name="api-search"),
+    path("stats/cache/", views.cache_stats, name="api-cache-stats"),
+]
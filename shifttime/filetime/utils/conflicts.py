@@ -0,0 +1,55 @@
+from collections import namedtuple
+
+try:
+    from .timeparser import lesson_order
+except ImportError:
+    # gui.py запускается из utils и импортирует модули без пакета
+    from timeparser import lesson_order
+
+
+KINDS = ("teacher", "room", "group")
+
+# что должно совпадать у пар одного слота, чтобы это была одна пара, а не накладка:
+# поток из нескольких групп у одного преподавателя в одном кабинете - не конфликт
+SAME_LESSON_FIELDS = {
+    "teacher": ("subj", "room"),
+    "room": ("subj", "teacher"),
+    "group": ("subj", "teacher", "room"),
+}
+
+Conflict = namedtuple("Conflict", "kind key dt lesson_num pairs")
+
+
+def find_conflicts(pairs, kinds=KINDS):
+    # один проход: (дата, номер пары, ключ) -> пары слота
+    slots = {kind: {} for kind in kinds}
+    for pair in pairs:
+        for kind in kinds:
+            key = pair[kind]
+            if key:
+                slots[kind].setdefault((pair["dt"], pair["lesson_num"], key), []).append(pair)
+
+    conflicts = []
+    for kind, grouped in slots.items():
+        fields = SAME_LESSON_FIELDS[kind]
+        for (dt, lesson_num, key), slot_pairs in grouped.items():
+            if len(slot_pairs) < 2:
+                continue
+            lessons = {tuple(pair[field] for field in fields) for pair in slot_pairs}
+            if len(lessons) > 1:
+                conflicts.append(Conflict(kind, key, dt, lesson_num, slot_pairs))
+
+    # номер пары числом: 10-я пара после 2-й
+    conflicts.sort(key=lambda conflict: (
+        lesson_order(conflict), str(conflict.lesson_num), conflict.kind, conflict.key
+    ))
+    return conflicts
+
+
+def conflict_slots(conflicts, kind):
+    # (ключ, дата, номер пары) для быстрой пометки в списках
+    return {
+        (conflict.key, conflict.dt, conflict.lesson_num)
+        for conflict in conflicts
+        if conflict.kind == kind
+    }
@@ -1,6 +1,29 @@
+import time
+STARTED = time.perf_counter()
+
+import json
+import multiprocessing
+import queue
+import sys
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
-from timeparser import ScheduleParser  
+from pathlib import Path
+from tkinter import filedialog, messagebox, ttk
+from conflicts import conflict_slots, find_conflicts
+from parsecache import ParseCache
+from snapshot import load_snapshot, save_snapshot
+# openpyxl timeparser импортирует только при разборе книги
+from timeparser import ParseCancelled, load_cached, parse_cached
+
+IMPORTS_S = time.perf_counter() - STARTED
+
+APP_DIR = Path.home() / ".shifttime"
+CACHE_DIR = APP_DIR / "parse_cache"
+SNAPSHOT_PATH = APP_DIR / "last_file.json"
+# строка JSON на каждый запуск: время до окна и до списка преподавателей
+STARTUP_LOG = APP_DIR / "startup.jsonl"
+# как часто окно забирает сообщения потока разбора, мс
+POLL_INTERVAL = 50
 
 class ScheduleApp:
     def __init__(self, root):
@@ -9,18 +32,67 @@ class ScheduleApp:
         self.root.geometry("700x600")
         self.root.resizable(True, True)
 
-        self.load_button = tk.Button(root, text="Загрузите файл с расписанием", command=self.load_file)
-        self.load_button.pack(pady=20)
+        controls = tk.Frame(root)
+        controls.pack(pady=20)
+        self.load_button = tk.Button(controls, text="Загрузите файл с расписанием", command=self.load_file)
+        self.load_button.pack(side=tk.LEFT)
+        self.progress = ttk.Progressbar(controls, length=200, maximum=100)
+        self.progress.pack(side=tk.LEFT, padx=10)
+        self.cancel_button = tk.Button(controls, text="Отмена", command=self.cancel_load, state='disabled')
+        self.cancel_button.pack(side=tk.LEFT)
 
-        self.teachers_listbox = tk.Listbox(root, width=50, height=10)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', self.filter_teachers)
+        self.search_entry = tk.Entry(root, textvariable=self.search_var, width=50)
+        self.search_entry.pack()
+
+        # строки списка берутся из переменной: фильтр меняет ее одним вызовом, без delete/insert
+        self.teachers_var = tk.Variable(value=())
+        self.teachers_listbox = tk.Listbox(root, width=50, height=10, listvariable=self.teachers_var)
         self.teachers_listbox.pack(pady=20, fill=tk.BOTH, expand=True)
         self.teachers_listbox.bind('<<ListboxSelect>>', self.show_teacher_info)
 
         self.info_text = tk.Text(root, width=60, height=10, state='disabled')
+        self.info_text.tag_configure('conflict', background='#FAFD0A')
         self.info_text.pack(pady=20, fill=tk.BOTH, expand=True)
 
         self.parser = None
-        self.teachers = {}
+        self.teachers = []
+        self.visible = []
+        self.last_query = None
+        self.teacher_conflicts = set()
+        self.parse_cache = ParseCache(CACHE_DIR)
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+        self.measure_only = '--measure-startup' in sys.argv
+        self.startup = {'imports_s': round(IMPORTS_S, 4)}
+        self.root.after_idle(self.on_first_idle)
+
+    def on_first_idle(self):
+        self.startup['window_s'] = round(time.perf_counter() - STARTED, 4)
+        snapshot = load_snapshot(SNAPSHOT_PATH)
+        self.startup['snapshot'] = snapshot is not None
+        if snapshot:
+            self.start_load(*snapshot)
+        else:
+            self.finish_startup()
+
+    def finish_startup(self):
+        if self.startup is None:
+            return
+        self.startup['frozen'] = getattr(sys, 'frozen', False)
+        line = json.dumps(self.startup)
+        self.startup = None
+        try:
+            APP_DIR.mkdir(parents=True, exist_ok=True)
+            with open(STARTUP_LOG, 'a', encoding='utf-8') as log:
+                log.write(line + "\n")
+        except OSError:
+            pass
+        if self.measure_only:
+            print(line)
+            self.root.destroy()
 
     def load_file(self):
         file_path = filedialog.askopenfilename(
@@ -28,47 +100,126 @@ class ScheduleApp:
             filetypes=(("Excel files", "*.xlsx"), ("All files", "*.*"))
         )
         if file_path:
+            self.start_load(file_path)
+
+    def start_load(self, file_path, digest=None):
+        self.cancel_event = threading.Event()
+        self.load_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.progress['value'] = 0
+        worker = threading.Thread(
+            target=self.parse_file, args=(file_path, digest, self.cancel_event), daemon=True
+        )
+        worker.start()
+        self.root.after(POLL_INTERVAL, self.poll_messages)
+
+    def cancel_load(self):
+        self.cancel_event.set()
+        self.cancel_button.config(state='disabled')
+
+    def parse_file(self, file_path, digest, cancel_event):
+        # поток разбора не трогает виджеты: Tk однопоточный, результат идет через очередь
+        last_percent = -1
+
+        def progress(done):
+            nonlocal last_percent
+            if cancel_event.is_set():
+                raise ParseCancelled()
+            percent = int(done * 100)
+            if percent != last_percent:
+                last_percent = percent
+                self.messages.put(('progress', percent))
+
+        try:
+            # файл из снимка берется из кэша по digest, остальные хэшируются и
+            # при повторном открытии тоже читаются из кэша без разбора
+            parser = load_cached(digest, self.parse_cache) if digest else None
+            if parser is None:
+                parser = parse_cached(file_path, self.parse_cache, progress=progress)
             try:
-                self.parser = ScheduleParser(file_path)
-                self.parser.parse_schedule()
-                self.teachers = self.parser.get_teachers_schedule()
+                save_snapshot(SNAPSHOT_PATH, file_path, parser.digest)
+            except OSError:
+                pass
+            teachers = sorted(parser.get_teachers_schedule())
+            conflicts = find_conflicts(parser.iter_pairs(), kinds=("teacher",))
+            self.messages.put(('done', (parser, teachers, conflict_slots(conflicts, "teacher"))))
+        except ParseCancelled:
+            self.messages.put(('cancelled', None))
+        except Exception as e:
+            self.messages.put(('error', e))
+
+    def poll_messages(self):
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.progress['value'] = payload
+                continue
+
+            self.load_button.config(state='normal')
+            self.cancel_button.config(state='disabled')
+            if kind == 'done':
+                self.progress['value'] = 100
+                self.parser, self.teachers, self.teacher_conflicts = payload
                 self.populate_teachers_list()
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"не удалось обработать: {e}")
+                if self.startup is not None:
+                    self.root.update_idletasks()
+                    self.startup['teachers_s'] = round(time.perf_counter() - STARTED, 4)
+            else:
+                self.progress['value'] = 0
+                if kind == 'error' and not self.measure_only:
+                    messagebox.showerror("Ошибка", f"не удалось обработать: {payload}")
+            self.finish_startup()
+            return
+        self.root.after(POLL_INTERVAL, self.poll_messages)
 
     def populate_teachers_list(self):
-        self.teachers_listbox.delete(0, tk.END)
+        self.last_query = None
+        self.filter_teachers()
 
-        for teacher in self.teachers:
-            self.teachers_listbox.insert(tk.END, teacher)
+    def filter_teachers(self, *args):
+        query = self.search_var.get().strip().casefold()
+        if self.last_query is not None and query.startswith(self.last_query):
+            # запрос дописан: ищем только среди уже найденных
+            source = self.visible
+        else:
+            source = [(teacher.casefold(), teacher) for teacher in self.teachers]
+        self.visible = [item for item in source if query in item[0]]
+        self.last_query = query
+        self.teachers_var.set([teacher for _, teacher in self.visible])
 
     def show_teacher_info(self, event):
         selection = self.teachers_listbox.curselection()
         if selection:
             teacher_name = self.teachers_listbox.get(selection[0])
 
-          
-            self.info_text.config(state='normal')
-            self.info_text.delete(1.0, tk.END)
-
-            schedule = self.teachers[teacher_name]
-            entries = []
+            # текст с тегами собирается заранее и вставляется одним вызовом
+            parts = []
+            lines = []
+            schedule = self.parser.get_teachers_schedule()[teacher_name]
             for entry in schedule:
                 dt = entry['dt'].strftime('%d.%m.%Y')
                 num = entry['lesson_num']
-                mem_str = dt + str(num)
-                if mem_str in entries:
-                    self.info_text.insert(tk.END, f"ДУБЛИКАТ!!!\n", fill='FAFD0A')
-                else:
-                    entries.append(mem_str)
-                self.info_text.insert(tk.END, f"Дата: {dt}\n")
-                self.info_text.insert(tk.END, f"Номер пары: {num}\n")
-                self.info_text.insert(tk.END, f"Предмет: {entry['subj']}\n")
-                self.info_text.insert(tk.END, "-"*40 + "\n")
+                if (teacher_name, entry['dt'], num) in self.teacher_conflicts:
+                    conflict = f"КОНФЛИКТ!!! ({entry['group']}, {entry['room']})\n"
+                    parts += ["".join(lines), (), conflict, ('conflict',)]
+                    lines = []
+                lines.append(f"Дата: {dt}\n")
+                lines.append(f"Номер пары: {num}\n")
+                lines.append(f"Предмет: {entry['subj']}\n")
+                lines.append("-"*40 + "\n")
+            parts += ["".join(lines), ()]
 
+            self.info_text.config(state='normal')
+            self.info_text.delete(1.0, tk.END)
+            self.info_text.insert(tk.END, *parts)
             self.info_text.config(state='disabled')
 
 if __name__ == "__main__":
+    # листы разбираются в пуле процессов, в сборке PyInstaller это обязательно
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ScheduleApp(root)
     root.mainloop()
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+
+FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ParseCache:
+    # Результаты разбора по sha256 содержимого файла и версии парсера.
+    # На диске: gzip(json) с таблицей строк, строки пар хранят индексы в ней.
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_digest(excel_file):
+        digest = hashlib.sha256()
+        if hasattr(excel_file, "read"):
+            position = excel_file.tell()
+            excel_file.seek(0)
+            for chunk in iter(lambda: excel_file.read(1024 * 1024), b""):
+                digest.update(chunk)
+            excel_file.seek(position)
+        else:
+            with open(excel_file, "rb") as src:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def path_for(self, digest, parser_version):
+        return self.directory / f"{digest}-p{parser_version}-f{FORMAT_VERSION}.json.gz"
+
+    def get(self, digest, parser_version):
+        path = self.path_for(digest, parser_version)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as src:
+                data = json.load(src)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # время доступа для вытеснения давно не использованных записей
+        os.utime(path)
+        self.hits += 1
+        strings = data["strings"]
+        return [
+            (
+                strings[subj], strings[group],
+                datetime.combine(date.fromordinal(day), datetime.min.time()),
+                lesson_num, strings[teacher], strings[room],
+            )
+            for subj, group, day, lesson_num, teacher, room in data["rows"]
+        ]
+
+    def put(self, digest, parser_version, rows):
+        strings = {}
+
+        def ref(value):
+            return strings.setdefault(value, len(strings))
+
+        packed = [
+            [ref(subj), ref(group), dt.toordinal(), lesson_num, ref(teacher), ref(room)]
+            for subj, group, dt, lesson_num, teacher, room in rows
+        ]
+        payload = json.dumps(
+            {"strings": list(strings), "rows": packed},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as dst:
+                dst.write(payload.encode("utf-8"))
+            # атомарная замена: читатели не увидят недописанный файл
+            os.replace(tmp_path, self.path_for(digest, parser_version))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob("*.json.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,44 @@
+import json
+import os
+from pathlib import Path
+
+
+SNAPSHOT_VERSION = 1
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def save_snapshot(snapshot_path, file_path, digest):
+    # последний открытый файл: при запуске его пары берутся из кэша разбора
+    # по digest, без хэширования файла и без openpyxl
+    snapshot_path = Path(snapshot_path)
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "file": str(file_path),
+        "signature": file_signature(file_path),
+        "digest": digest,
+    }
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, snapshot_path)
+
+
+def load_snapshot(snapshot_path):
+    # (путь, digest); digest None, если файл изменился после снимка
+    try:
+        data = json.loads(Path(snapshot_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != SNAPSHOT_VERSION:
+        return None
+    try:
+        signature = file_signature(data["file"])
+    except OSError:
+        return None
+    if signature != data["signature"]:
+        return data["file"], None
+    return data["file"], data["digest"]
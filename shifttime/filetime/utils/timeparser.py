@@ -1,80 +1,357 @@
-from openpyxl import load_workbook
-from openpyxl.cell.cell import Cell
-from openpyxl.cell import MergedCell
+from functools import lru_cache
+from io import BytesIO
+from typing import TYPE_CHECKING
+import os
 import re
+import sys
+import time
 from datetime import datetime
 
+# openpyxl и пул процессов импортируются при первом открытии книги:
+# GUI показывает окно и список из снимка, не загружая их
+if TYPE_CHECKING:
+    from openpyxl.cell.cell import Cell
 
-class ScheduleParser:
-    def __init__(self, excel_file):
+try:
+    from .xlsx import XlsxWorkbook, iter_merge_refs
+except ImportError:
+    # gui.py запускается из utils и импортирует модули без пакета
+    from xlsx import XlsxWorkbook, iter_merge_refs
+
+
+CELL_CACHE_SIZE = 4096
+
+# openpyxl - полная модель книги; native - свое потоковое чтение zip (utils/xlsx.py)
+ENGINES = ("openpyxl", "native")
+DEFAULT_ENGINE = "openpyxl"
+
+# увеличивать при любом изменении результата разбора: сбрасывает кэш разбора
+PARSER_VERSION = 2
+
+DATE_PATTERN = re.compile(r"\d{2}\.\d{2}\.\d{4}")
+TEACHER_PATTERN = re.compile(r"([А-ЯЁа-яё]+ [А-ЯЁ]\.[А-ЯЁ]\.)")
+ROOM_PATTERN = re.compile(r"(?i)(каб(?:инет)?\.?\s*\d+(?:[^\n]*)|цок)")
+SPACES_PATTERN = re.compile(r"\s+")
+DIGIT_PATTERN = re.compile(r"\d")
+
+# секунды по этапам разбора и счетчики; складываются между листами книги
+STAT_KEYS = (
+    "load_s", "merged_s", "header_s", "rows_s", "regex_s",
+    "rows", "cells", "merged_ranges", "pairs",
+)
+
+
+def add_stats(target, source):
+    for key, value in source.items():
+        target[key] = target.get(key, 0) + value
+    return target
+
+
+class Pair:
+    # компактная запись пары вместо словаря из шести ключей
+    __slots__ = ("subj", "group", "dt", "lesson_num", "teacher", "room")
+
+    def __init__(self, subj, group, dt, lesson_num, teacher, room):
+        self.subj = subj
+        self.group = group
+        self.dt = dt
+        self.lesson_num = lesson_num
+        self.teacher = teacher
+        self.room = room
+
+    def __getitem__(self, key):
+        # совместимость с кодом, который работал со словарями pair["teacher"]
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def as_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def as_dict(self):
+        return dict(zip(self.__slots__, self.as_tuple()))
+
+    def __eq__(self, other):
+        if not isinstance(other, Pair):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return f"Pair({self.as_dict()!r})"
+
+
+def lesson_order(pair):
+    # номер пары из ячейки бывает числом, строкой или пустым
+    num = pair.lesson_num
+    if isinstance(num, int):
+        return pair.dt, num
+    if isinstance(num, str) and num.strip().isdigit():
+        return pair.dt, int(num)
+    return pair.dt, 0
+
+
+class PairIndexes:
+    # преподаватель/группа/кабинет -> пары по (дата, номер пары),
+    # строятся за один проход при первом обращении
+    _indexes = None
+
+    def build_indexes(self):
+        teachers, groups, rooms = {}, {}, {}
+        for pair in self.iter_pairs():
+            teachers.setdefault(pair.teacher, []).append(pair)
+            groups.setdefault(pair.group, []).append(pair)
+            if pair.room:
+                rooms.setdefault(pair.room, []).append(pair)
+        for index in (teachers, groups, rooms):
+            for entries in index.values():
+                # пары идут в порядке листа, сортировка почти линейная
+                entries.sort(key=lesson_order)
+        return {"teacher": teachers, "group": groups, "room": rooms}
+
+    def get_index(self, kind):
+        if self._indexes is None:
+            self._indexes = self.build_indexes()
+        return self._indexes[kind]
+
+    @property
+    def teacher_index(self):
+        return self.get_index("teacher")
+
+    @property
+    def group_index(self):
+        return self.get_index("group")
+
+    @property
+    def room_index(self):
+        return self.get_index("room")
+
+    def get_teachers_schedule(self):
+        return self.teacher_index
+
+
+class ParsedSchedule(PairIndexes):
+    # уже разобранные пары с тем же интерфейсом чтения, что у ScheduleParser
+    def __init__(self, pairs, stats=None, digest=None):
+        self.pairs = pairs
+        self.stats = stats if stats is not None else {}
+        # sha256 файла, если результат прошел через кэш разбора
+        self.digest = digest
+
+    def iter_pairs(self):
+        return iter(self.pairs)
+
+    def close(self):
+        pass
+
+
+class ParseCancelled(Exception):
+    # колбэк прогресса бросает его, чтобы прервать разбор
+    pass
+
+
+def load_cached(digest, cache, started=None):
+    # без openpyxl: только чтение готового результата из кэша
+    if started is None:
+        started = time.perf_counter()
+    rows = cache.get(digest, PARSER_VERSION)
+    if rows is None:
+        return None
+    stats = {"cache_hits": 1, "cache_s": time.perf_counter() - started, "pairs": len(rows)}
+    return ParsedSchedule([Pair(*row) for row in rows], stats, digest)
+
+
+def parse_cached(excel_file, cache, read_only=True, progress=None, engine=DEFAULT_ENGINE):
+    started = time.perf_counter()
+    digest = cache.file_digest(excel_file)
+    parsed = load_cached(digest, cache, started)
+    if parsed is not None:
+        return parsed
+
+    parsed = parse_workbook(excel_file, read_only=read_only, progress=progress, engine=engine)
+    cache.put(digest, PARSER_VERSION, (pair.as_tuple() for pair in parsed.pairs))
+    parsed.digest = digest
+    return parsed
+
+
+def parse_cell_text(val):
+    teacher_match = TEACHER_PATTERN.search(val)
+    if teacher_match:
+        subject = val[:teacher_match.start()].strip()
+        teacher = SPACES_PATTERN.sub(' ', teacher_match.group(1).strip())
+
+        room_text = val[teacher_match.end():].strip()
+        room_match = ROOM_PATTERN.search(room_text)
+        room = room_match.group(0).strip() if room_match else ""
+
+        return sys.intern(subject), sys.intern(teacher), sys.intern(room)
+    return False
+
+
+class ScheduleParser(PairIndexes):
+    def __init__(
+        self, excel_file, read_only=False, cache_size=CELL_CACHE_SIZE, sheet=None,
+        engine=DEFAULT_ENGINE,
+    ):
         self.days = []
-        self.wb = load_workbook(filename=excel_file)
-        self.ws = self.wb.active
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        started = time.perf_counter()
+        self.wb = open_workbook(excel_file, read_only, engine)
+        # native читает только потоком, объединения обрабатываются как в read_only
+        self.read_only = read_only or engine == "native"
+        self.ws = self.wb.active if sheet is None else self.wb[sheet]
+        self.stats["load_s"] = time.perf_counter() - started
         self.date_column = 1
+        self.header_row = 2
         self.first_row = 2
         self.last_date_col = None
         self.groups_by_col = {}
+        self._merged_index = None
+        self._pending_anchors = {}
+        # один и тот же текст пары повторяется сотни раз за неделю
+        self._cell_text_cache = lru_cache(maxsize=cache_size)(self._parse_cell_text)
+
+    def cache_info(self):
+        return self._cell_text_cache.cache_info()
+
+    def close(self):
+        self.wb.close()
+
+    def _parse_cell_text(self, val):
+        # время регулярных выражений учитывается только для промахов кэша
+        started = time.perf_counter()
+        result = parse_cell_text(val)
+        self.stats["regex_s"] += time.perf_counter() - started
+        return result
+
+    @property
+    def merged_index(self):
+        # (row, col) -> значение верхней левой ячейки, строится один раз на лист
+        if self._merged_index is None:
+            started = time.perf_counter()
+            self._merged_index = self.build_merged_index()
+            self.stats["merged_s"] += time.perf_counter() - started
+        return self._merged_index
+
+    def iter_merged_ranges(self):
+        if self.read_only:
+            # лист в режиме read_only не отдает merged_cells, читаем <mergeCells> из xml
+            with self.wb._archive.open(self.ws._worksheet_path) as src:
+                yield from iter_merge_refs(src)
+        else:
+            for merged_range in self.ws.merged_cells.ranges:
+                yield merged_range.bounds
+
+    def build_merged_index(self):
+        index = {}
+        self._pending_anchors = {}
+        for min_col, min_row, max_col, max_row in self.iter_merged_ranges():
+            self.stats["merged_ranges"] += 1
+            if self.read_only:
+                # значение станет известно, когда поток дойдет до верхней левой ячейки:
+                # тогда resolve_value заполнит ячейки под ней; остальные ячейки
+                # объединения в потоке и так пустые
+                self._pending_anchors[(min_row, min_col)] = max_row
+                continue
+            value = self.ws.cell(row=min_row, column=min_col).value
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    if (row, col) == (min_row, min_col):
+                        continue
+                    # значение берется только в колонке верхней левой ячейки
+                    if col == min_col:
+                        index[(row, col)] = value
+                    else:
+                        index.setdefault((row, col), None)
+        return index
 
     def get_merged_cell_value(self, cell):
+        from openpyxl.cell import MergedCell
+
         if isinstance(cell, MergedCell):
-            for merged_range in self.ws.merged_cells.ranges:
-                if cell.coordinate in merged_range:
-                    if merged_range.min_col == cell.column:
-                        top_left_cell = self.ws.cell(
-                            row=merged_range.min_row, column=merged_range.min_col
-                        )
-                        return top_left_cell.value
-        else:
-            return cell.value
-        return None
+            return self.merged_index.get((cell.row, cell.column))
+        return cell.value
+
+    def resolve_value(self, row, col, value):
+        index = self.merged_index
+        key = (row, col)
+        if not self.read_only:
+            return index.get(key, value)
+
+        max_row = self._pending_anchors.pop(key, None)
+        if max_row is not None:
+            for covered_row in range(row + 1, max_row + 1):
+                index[(covered_row, col)] = value
+            return value
+        # пройденные строки больше не нужны, индекс не растет вместе с листом
+        return index.pop(key, value)
 
     def parse_date(self, col: str):
         if col:
-            date_match = re.search(r"\d{2}\.\d{2}\.\d{4}", col)
+            date_match = DATE_PATTERN.search(col)
             if date_match:
                 date_str = date_match.group()
                 date_obj = datetime.strptime(date_str, "%d.%m.%Y")
                 return date_obj
         return False
 
-    def parse_subject(self, cell: Cell):
-        val = self.get_merged_cell_value(cell)
+    def parse_subject(self, cell: "Cell"):
+        return self.parse_subject_text(self.get_merged_cell_value(cell))
+
+    def parse_subject_text(self, val):
         if val:
-            teacher_pattern = r"([А-ЯЁа-яё]+ [А-ЯЁ]\.[А-ЯЁ]\.)"
-            teacher_match = re.search(teacher_pattern, val)
-            if teacher_match:
-                subject = val[:teacher_match.start()].strip()
-                teacher = re.sub(r'\s+', ' ', teacher_match.group(1).strip())
-                
-                room_text = val[teacher_match.end():].strip()
-                room_pattern = r"(?i)(каб(?:инет)?\.?\s*\d+(?:[^\n]*)|цок)"
-                room_match = re.search(room_pattern, room_text)
-                room = room_match.group(0).strip() if room_match else ""
-                
-                return subject, teacher, room
+            return self._cell_text_cache(val)
         return False
 
+    def parse_header(self, values):
+        for col_idx, value in enumerate(values, start=1):
+            if value and isinstance(value, str) and DIGIT_PATTERN.search(value):
+                self.groups_by_col[col_idx] = tuple(
+                    sys.intern(group.strip()) for group in value.strip().split("\n")
+                )
 
-    def parse_schedule(self):
-        max_row = self.ws.max_row
-        max_col = self.ws.max_column
-
-        header_row = self.ws[2]
-        for col_idx, cell in enumerate(header_row, start=1):
-            value = self.get_merged_cell_value(cell)
-            if value and isinstance(value, str) and re.search(r"\d", value):
-                self.groups_by_col[col_idx] = value.strip()
-
+    def iter_value_rows(self):
+        # чтение с первой строки: объединение может начинаться выше first_row
+        # индекс объединений строится заранее, его время считается отдельно от строк
+        self.merged_index
+        stats = self.stats
+        started = time.perf_counter()
         iter_rows = self.ws.iter_rows(
-            min_row=self.first_row,
-            max_row=max_row,
+            min_row=1,
+            max_row=self.ws.max_row,
             min_col=self.date_column,
-            max_col=max_col,
+            max_col=self.ws.max_column,
+            values_only=True,
         )
+        for row_idx, raw in enumerate(iter_rows, start=1):
+            values = [
+                self.resolve_value(row_idx, col_idx, value)
+                for col_idx, value in enumerate(raw, start=self.date_column)
+            ]
+            stats["rows"] += 1
+            stats["cells"] += len(raw) - raw.count(None)
+            # время чтения строк без времени потребителя генератора
+            stats["rows_s"] += time.perf_counter() - started
+            if row_idx >= self.first_row:
+                yield row_idx, raw, values
+            started = time.perf_counter()
+
+    def iter_days(self):
+        if self.read_only:
+            # индекс расходуется при потоковом чтении, на каждый проход строим заново
+            self._merged_index = None
+        self.last_date_col = None
 
-        for row in iter_rows:
-            date_col = row[0].value
-            lesson_num = row[1].value
+        for row_idx, raw, values in self.iter_value_rows():
+            if row_idx == self.header_row:
+                started = time.perf_counter()
+                self.parse_header(values)
+                self.stats["header_s"] += time.perf_counter() - started
+
+            date_col = raw[0]
+            lesson_num = raw[1]
 
             dt = None
 
@@ -87,21 +364,112 @@ class ScheduleParser:
 
             day = []
             if dt:
-                for col_idx, col in enumerate(row[2:], start=3):
-                    result = self.parse_subject(col)
+                for col_idx, val in enumerate(values[2:], start=3):
+                    result = self.parse_subject_text(val)
                     if result:
                         subj, teacher, room = result
-                        group_str = self.groups_by_col.get(col_idx, "")
-                        groups = group_str.split("\n")
+                        groups = self.groups_by_col.get(col_idx, ("",))
                         for group in groups:
-                            pair = {
-                                "subj": subj,
-                                "group": group.strip(),
-                                "dt": dt,
-                                "lesson_num": lesson_num,
-                                "teacher": teacher,
-                                "room": room,
-                            }
-                            day.append(pair)
+                            day.append(
+                                Pair(subj, group, dt, lesson_num, teacher, room)
+                            )
+
+            self.stats["pairs"] += len(day)
+            yield day
 
+    def iter_pairs(self):
+        if self.days:
+            for day in self.days:
+                yield from day
+            return
+        for day in self.iter_days():
+            yield from day
+
+    def parse_schedule(self):
+        for day in self.iter_days():
             self.days.append(day)
+
+
+def open_workbook(excel_file, read_only=False, engine=DEFAULT_ENGINE):
+    if engine == "native":
+        return XlsxWorkbook(excel_file)
+    if engine != "openpyxl":
+        raise ValueError(f"неизвестный движок разбора: {engine}")
+    from openpyxl import load_workbook
+
+    return load_workbook(filename=excel_file, read_only=read_only)
+
+
+def list_sheets(excel_file, engine=DEFAULT_ENGINE):
+    if hasattr(excel_file, "seek"):
+        excel_file.seek(0)
+    wb = open_workbook(excel_file, read_only=True, engine=engine)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def parse_sheet(excel_file, sheet=None, read_only=True, progress=None, engine=DEFAULT_ENGINE):
+    if isinstance(excel_file, bytes):
+        excel_file = BytesIO(excel_file)
+    parser = ScheduleParser(excel_file, read_only=read_only, sheet=sheet, engine=engine)
+    try:
+        if progress is None:
+            return [pair.as_tuple() for pair in parser.iter_pairs()], parser.stats
+        rows = []
+        total = parser.ws.max_row or 1
+        for day in parser.iter_days():
+            rows.extend(pair.as_tuple() for pair in day)
+            progress(min(parser.stats["rows"] / total, 1))
+        return rows, parser.stats
+    finally:
+        parser.close()
+
+
+def parse_workbook(
+    excel_file, sheets=None, processes=None, read_only=True, progress=None, engine=DEFAULT_ENGINE
+):
+    # progress(доля от 0 до 1): по строкам при разборе в этом процессе, по листам в пуле
+    # каждый лист со своей шапкой и группами разбирается в отдельном процессе
+    if sheets is None:
+        sheets = list_sheets(excel_file, engine)
+    if hasattr(excel_file, "read"):
+        excel_file.seek(0)
+        excel_file = excel_file.read()
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(sheets))
+
+    if processes <= 1:
+        results = []
+        for index, sheet in enumerate(sheets):
+            sheet_progress = None
+            if progress is not None:
+                def sheet_progress(done, index=index):
+                    progress((index + done) / len(sheets))
+            results.append(parse_sheet(excel_file, sheet, read_only, sheet_progress, engine))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(parse_sheet, excel_file, sheet, read_only, None, engine)
+                for sheet in sheets
+            ]
+            if progress is not None:
+                try:
+                    for done, _ in enumerate(as_completed(futures), start=1):
+                        progress(done / len(sheets))
+                except BaseException:
+                    # при отмене еще не начатые листы не разбираются
+                    for future in futures:
+                        future.cancel()
+                    raise
+            results = [future.result() for future in futures]
+
+    stats = {}
+    for _, sheet_stats in results:
+        add_stats(stats, sheet_stats)
+    return ParsedSchedule([Pair(*row) for rows, _ in results for row in rows], stats)
@@ -0,0 +1,316 @@
+import posixpath
+import re
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import iterparse
+from zipfile import ZipFile
+
+
+# Чтение .xlsx без openpyxl: только значения ячеек, общие строки и объединения.
+# Интерфейс листа повторяет ReadOnlyWorksheet openpyxl в той части, что нужна
+# ScheduleParser: iter_rows(values_only=True), max_row, max_column, _worksheet_path.
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+ROW_TAG = MAIN_NS + "row"
+VALUE_TAG = MAIN_NS + "v"
+FORMULA_TAG = MAIN_NS + "f"
+INLINE_TAG = MAIN_NS + "is"
+TEXT_TAG = MAIN_NS + "t"
+RUN_TAG = MAIN_NS + "r"
+STRING_TAG = MAIN_NS + "si"
+SHEET_DATA_TAG = MAIN_NS + "sheetData"
+DIMENSION_TAG = MAIN_NS + "dimension"
+
+# последняя часть типа связи
+OFFICE_DOCUMENT = "officeDocument"
+SHARED_STRINGS = "sharedStrings"
+STYLES = "styles"
+
+WINDOWS_EPOCH = datetime(1899, 12, 30)
+MAC_EPOCH = datetime(1904, 1, 1)
+# встроенные форматы дат и времени (ECMA-376, 18.8.30)
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+# как в openpyxl: цвета, условия и текст в кавычках не делают формат датой
+FORMAT_STRIP_PATTERN = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+DATE_FORMAT_PATTERN = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+REF_PATTERN = re.compile(r"\$?([A-Z]+)\$?(\d+)")
+# "<" в тексте ячеек экранирован, поэтому в байтах листа так начинается только тег
+MERGE_REF_PATTERN = re.compile(rb'<(?:\w+:)?mergeCell\s[^>]*?\bref="([^"]+)"')
+CHUNK_SIZE = 1024 * 1024
+
+
+def column_index(letters):
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def range_bounds(ref):
+    # "B2:D5" -> (min_col, min_row, max_col, max_row), как range_boundaries openpyxl
+    first, _, last = ref.upper().partition(":")
+    first_col, first_row = REF_PATTERN.fullmatch(first).groups()
+    last_col, last_row = REF_PATTERN.fullmatch(last or first).groups()
+    return (
+        column_index(first_col), int(first_row), column_index(last_col), int(last_row)
+    )
+
+
+def iter_merge_refs(src):
+    # <mergeCells> лежит после sheetData: поиск по байтам вместо разбора всего xml листа
+    tail = b""
+    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+        data = tail + chunk
+        end = 0
+        for match in MERGE_REF_PATTERN.finditer(data):
+            yield range_bounds(match.group(1).decode("ascii"))
+            end = match.end()
+        # тег может быть разрезан границей куска
+        start = data.rfind(b"<", end)
+        tail = data[start:] if start != -1 else b""
+
+
+def is_date_format(fmt):
+    fmt = FORMAT_STRIP_PATTERN.sub("", fmt.split(";")[0])
+    return DATE_FORMAT_PATTERN.search(fmt) is not None
+
+
+def from_excel(value, epoch):
+    day, fraction = divmod(value, 1)
+    diff = timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        return (datetime.min + diff).time()
+    # 1900 в Excel ошибочно високосный: серийные номера до 1 марта сдвинуты на день
+    if 0 < value < 60 and epoch == WINDOWS_EPOCH:
+        day += 1
+    return epoch + timedelta(days=day) + diff
+
+
+def cast_number(value):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def string_content(element):
+    # текст <t> и всех <r><t>, без фонетических подсказок <rPh>
+    parts = []
+    for child in element:
+        if child.tag == TEXT_TAG:
+            parts.append(child.text or "")
+        elif child.tag == RUN_TAG:
+            parts.append(child.findtext(TEXT_TAG) or "")
+    return "".join(parts)
+
+
+class XlsxWorkbook:
+    def __init__(self, excel_file):
+        self._archive = ZipFile(excel_file)
+        try:
+            self._read_workbook()
+        except Exception:
+            self._archive.close()
+            raise
+
+    def _relationships(self, part):
+        folder, name = posixpath.split(part)
+        rels_path = posixpath.join(folder, "_rels", name + ".rels")
+        targets = {}
+        with self._archive.open(rels_path) as src:
+            for _, element in iterparse(src):
+                if element.tag == PKG_REL_NS + "Relationship":
+                    target = element.get("Target")
+                    if target.startswith("/"):
+                        target = target[1:]
+                    else:
+                        target = posixpath.normpath(posixpath.join(folder, target))
+                    kind = element.get("Type").rsplit("/", 1)[-1]
+                    targets[element.get("Id")] = (kind, target)
+        return targets
+
+    def _read_workbook(self):
+        root_rels = self._relationships("")
+        workbook_path = next(
+            target for kind, target in root_rels.values() if kind == OFFICE_DOCUMENT
+        )
+        rels = self._relationships(workbook_path)
+
+        self.sheetnames = []
+        self._sheet_paths = {}
+        self._active_index = 0
+        self.epoch = WINDOWS_EPOCH
+        with self._archive.open(workbook_path) as src:
+            for _, element in iterparse(src):
+                if element.tag == MAIN_NS + "sheet":
+                    name = element.get("name")
+                    self.sheetnames.append(name)
+                    self._sheet_paths[name] = rels[element.get(REL_NS + "id")][1]
+                elif element.tag == MAIN_NS + "workbookView":
+                    self._active_index = int(element.get("activeTab", 0))
+                elif element.tag == MAIN_NS + "workbookPr":
+                    if element.get("date1904") in ("1", "true"):
+                        self.epoch = MAC_EPOCH
+
+        parts = dict(rels.values())
+        self.shared_strings = self._read_shared_strings(parts.get(SHARED_STRINGS))
+        self.date_styles = self._read_date_styles(parts.get(STYLES))
+
+    def _read_shared_strings(self, path):
+        strings = []
+        if path is None:
+            return strings
+        with self._archive.open(path) as src:
+            for _, element in iterparse(src):
+                if element.tag == STRING_TAG:
+                    strings.append(string_content(element).replace("x005F_", ""))
+                    element.clear()
+        return strings
+
+    def _read_date_styles(self, path):
+        # номера стилей ячеек (атрибут s) с форматом даты: их числа - даты
+        date_styles = set()
+        if path is None:
+            return date_styles
+        custom = {}
+        number_formats = []
+        in_cell_xfs = False
+        with self._archive.open(path) as src:
+            for event, element in iterparse(src, events=("start", "end")):
+                if element.tag == MAIN_NS + "cellXfs":
+                    in_cell_xfs = event == "start"
+                elif event != "end":
+                    continue
+                elif element.tag == MAIN_NS + "numFmt":
+                    custom[int(element.get("numFmtId"))] = element.get("formatCode", "")
+                elif element.tag == MAIN_NS + "xf" and in_cell_xfs:
+                    number_formats.append(int(element.get("numFmtId", 0)))
+        for index, format_id in enumerate(number_formats):
+            if format_id in custom:
+                if is_date_format(custom[format_id]):
+                    date_styles.add(index)
+            elif format_id in BUILTIN_DATE_FORMATS:
+                date_styles.add(index)
+        return date_styles
+
+    @property
+    def active(self):
+        index = self._active_index if self._active_index < len(self.sheetnames) else 0
+        return self[self.sheetnames[index]]
+
+    def __getitem__(self, name):
+        if name not in self._sheet_paths:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        return XlsxSheet(self, name, self._sheet_paths[name])
+
+    def close(self):
+        self._archive.close()
+
+
+class XlsxSheet:
+    def __init__(self, parent, title, worksheet_path):
+        self.parent = parent
+        self.title = title
+        self._worksheet_path = worksheet_path
+        self.min_column = self.min_row = 1
+        self.max_column = self.max_row = None
+        self._read_dimension()
+
+    def _read_dimension(self):
+        with self.parent._archive.open(self._worksheet_path) as src:
+            for _, element in iterparse(src, events=("start",)):
+                if element.tag == DIMENSION_TAG:
+                    ref = element.get("ref")
+                    if ref:
+                        self.min_column, self.min_row, self.max_column, self.max_row = range_bounds(ref)
+                    return
+                if element.tag == SHEET_DATA_TAG:
+                    return
+
+    def iter_xml_rows(self):
+        strings = self.parent.shared_strings
+        date_styles = self.parent.date_styles
+        epoch = self.parent.epoch
+        columns = {}
+        row_counter = 0
+        with self.parent._archive.open(self._worksheet_path) as src:
+            for _, element in iterparse(src):
+                tag = element.tag
+                if tag == SHEET_DATA_TAG:
+                    # после данных только объединения и разметка печати
+                    break
+                if tag != ROW_TAG:
+                    continue
+                row_number = element.get("r")
+                row_counter = int(row_number) if row_number else row_counter + 1
+                cells = []
+                column = 0
+                for cell in element:
+                    ref = cell.get("r")
+                    if ref:
+                        letters = ref.rstrip("0123456789")
+                        column = columns.get(letters)
+                        if column is None:
+                            column = columns[letters] = column_index(letters)
+                    else:
+                        column += 1
+                    data_type = cell.get("t", "n")
+                    if data_type == "inlineStr":
+                        inline = cell.find(INLINE_TAG)
+                        value = None if inline is None else string_content(inline)
+                    else:
+                        value = cell.findtext(VALUE_TAG) or None
+                    formula = cell.find(FORMULA_TAG)
+                    if formula is not None:
+                        # как openpyxl без data_only: формула вместо значения
+                        value = "=" + (formula.text or "")
+                    elif value is not None and data_type != "inlineStr":
+                        if data_type == "s":
+                            value = strings[int(value)]
+                        elif data_type == "n":
+                            value = cast_number(value)
+                            style = cell.get("s")
+                            if style and int(style) in date_styles:
+                                value = from_excel(value, epoch)
+                        elif data_type == "b":
+                            value = bool(int(value))
+                        elif data_type == "d":
+                            value = datetime.fromisoformat(value.rstrip("Z"))
+                    cells.append((column, value))
+                element.clear()
+                yield row_counter, cells
+
+    def iter_rows(self, min_row=1, max_row=None, min_col=1, max_col=None, values_only=True):
+        # пропущенные в xml строки и ячейки заполняются None, как в openpyxl
+        if not values_only:
+            raise ValueError("XlsxSheet отдает только значения")
+        max_col = max_col or self.max_column
+        max_row = max_row or self.max_row
+        empty_row = () if max_col is None else (None,) * (max_col + 1 - min_col)
+
+        counter = min_row
+        idx = 1
+        for idx, cells in self.iter_xml_rows():
+            if max_row is not None and idx > max_row:
+                break
+            for _ in range(counter, idx):
+                counter += 1
+                yield empty_row
+            if counter <= idx:
+                counter += 1
+                yield self._get_row(cells, min_col, max_col)
+
+        if max_row is not None and max_row < idx:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+    def _get_row(self, cells, min_col, max_col):
+        if not cells and not max_col:
+            return ()
+        max_col = max_col or cells[-1][0]
+        row = [None] * (max_col + 1 - min_col)
+        for column, value in cells:
+            if min_col <= column <= max_col:
+                row[column - min_col] = value
+        return tuple(row)
@@ -1,3 +1,209 @@
-from django.shortcuts import render
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-# Create your views here.
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.http import (
+    HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from filetime import export, search_index, timetable_cache, timetable_snapshot
+from filetime.models import TimetableEntry
+
+
+def week_bounds(day: date) -> Tuple[date, date]:
+    week_start: date = day - timedelta(days=day.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+def render_json(
+    payload: Dict[str, Any], last_modified: Optional[datetime]
+) -> timetable_cache.Rendered:
+    body: bytes = json.dumps(
+        payload, cls=DjangoJSONEncoder, ensure_ascii=False
+    ).encode("utf-8")
+    return {
+        "body": body,
+        "etag": quote_etag(hashlib.md5(body, usedforsecurity=False).hexdigest()),
+        "last_modified": int(last_modified.timestamp()) if last_modified else None,
+    }
+
+
+def conditional_json(
+    request: HttpRequest, rendered: timetable_cache.Rendered
+) -> HttpResponse:
+    etag: str = rendered["etag"]
+    last_modified_ts: Optional[int] = rendered["last_modified"]
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified_ts
+    )
+    if response is None:
+        response = HttpResponse(rendered["body"], content_type="application/json")
+    response.headers["ETag"] = etag
+    if last_modified_ts is not None:
+        response.headers["Last-Modified"] = http_date(last_modified_ts)
+    return response
+
+
+# поле ответа -> колонка TimetableEntry; группа хранится ключом на Group
+COLUMNS: Dict[str, str] = {
+    "date": "date",
+    "order": "order",
+    "subject": "subject",
+    "teacher": "teacher",
+    "group": "group__name",
+    "room": "room",
+}
+
+
+def week_payload(
+    entries: Iterable[Dict[str, Any]], fields: List[str]
+) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+    lessons: List[Dict[str, Any]] = []
+    last_modified = None
+    for entry in entries:
+        updated_at = entry.pop("updated_at")
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+        lessons.append({field: entry[COLUMNS[field]] for field in fields})
+    return lessons, last_modified
+
+
+def render_teachers() -> timetable_cache.Rendered:
+    rows = (
+        TimetableEntry.objects.values("teacher")
+        .annotate(updated_at=Max("updated_at"))
+        .order_by("teacher")
+    )
+    names: List[str] = []
+    last_modified = None
+    for row in rows:
+        names.append(row["teacher"])
+        if last_modified is None or row["updated_at"] > last_modified:
+            last_modified = row["updated_at"]
+    return render_json({"teachers": names}, last_modified)
+
+
+def week_fields(kind: str) -> List[str]:
+    # для преподавателя в ответе группа, для группы - преподаватель
+    other: str = "group" if kind == "teacher" else "teacher"
+    return ["date", "order", "subject", other, "room"]
+
+
+def render_week_json(
+    kind: str, name: str, week_start: date, entries: Iterable[Dict[str, Any]]
+) -> timetable_cache.Rendered:
+    lessons, last_modified = week_payload(entries, week_fields(kind))
+    payload = {
+        kind: name,
+        "week_start": week_start,
+        "week_end": week_start + timedelta(days=6),
+        "lessons": lessons,
+    }
+    return render_json(payload, last_modified)
+
+
+def render_week(kind: str, name: str, week_start: date) -> timetable_cache.Rendered:
+    week_end: date = week_start + timedelta(days=6)
+    fields: List[str] = week_fields(kind)
+    entries = TimetableEntry.objects.filter(
+        **{COLUMNS[kind]: name}, date__range=(week_start, week_end)
+    ).order_by("date", "order", COLUMNS[fields[3]]).values(
+        *(COLUMNS[field] for field in fields), "updated_at"
+    )
+    return render_week_json(kind, name, week_start, entries)
+
+
+def cached_week(request: HttpRequest, kind: str, name: str, day: date) -> HttpResponse:
+    week_start, week_end = week_bounds(day)
+    snapshot = timetable_snapshot.current()
+    if snapshot is not None and snapshot.covers(week_start, week_end):
+        # текущие недели - из общего для процессов снимка в mmap, без базы и кэша
+        rendered = render_week_json(
+            kind, name, week_start, snapshot.week(kind, name, week_start, week_end)
+        )
+    else:
+        rendered = timetable_cache.get_or_render(
+            timetable_cache.week_key(kind, name, week_start),
+            lambda: render_week(kind, name, week_start),
+        )
+    return conditional_json(request, rendered)
+
+
+@require_safe
+def teachers(request: HttpRequest) -> HttpResponse:
+    rendered = timetable_cache.get_or_render(
+        timetable_cache.list_key("teachers"), render_teachers
+    )
+    return conditional_json(request, rendered)
+
+
+@require_safe
+def teacher_week(request: HttpRequest, name: str, day: date) -> HttpResponse:
+    return cached_week(request, "teacher", name, day)
+
+
+@require_safe
+def group_week(request: HttpRequest, group: str, day: date) -> HttpResponse:
+    return cached_week(request, "group", group, day)
+
+
+def optional_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+def export_response(request: HttpRequest, kind: str, name: str, fmt: str) -> HttpResponse:
+    try:
+        start = optional_date(request.GET.get("start"))
+        end = optional_date(request.GET.get("end"))
+    except ValueError:
+        return HttpResponseBadRequest("start и end задаются в формате ГГГГ-ММ-ДД")
+    # строки читаются из базы кусками по мере отправки, весь файл в памяти не собирается
+    response = StreamingHttpResponse(
+        export.export_calendar(fmt, kind, name, start, end),
+        content_type=export.CONTENT_TYPES[fmt],
+    )
+    response.headers["Content-Disposition"] = content_disposition_header(
+        True, export.export_filename(name, fmt)
+    )
+    return response
+
+
+@require_safe
+def teacher_export(request: HttpRequest, name: str, fmt: str) -> HttpResponse:
+    return export_response(request, "teacher", name, fmt)
+
+
+@require_safe
+def group_export(request: HttpRequest, group: str, fmt: str) -> HttpResponse:
+    return export_response(request, "group", group, fmt)
+
+
+@require_safe
+def autocomplete(request: HttpRequest) -> HttpResponse:
+    kinds: List[str] = request.GET.getlist("kind") or list(search_index.KINDS)
+    if not set(kinds) <= set(search_index.KINDS):
+        return HttpResponseBadRequest("kind: teacher, group или room")
+    try:
+        limit: int = min(int(request.GET.get("limit", 10)), 50)
+    except ValueError:
+        return HttpResponseBadRequest("limit должен быть числом")
+    # индекс в памяти процесса: на нажатие клавиши без запросов к базе
+    matches = search_index.get_index().search(request.GET.get("q", ""), kinds, limit)
+    return JsonResponse(
+        {"results": [{"kind": kind, "name": name} for kind, name in matches]},
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+@require_safe
+@staff_member_required
+def cache_stats(request: HttpRequest) -> HttpResponse:
+    return JsonResponse(timetable_cache.stats())
@@ -81,6 +81,27 @@ DATABASES = {
 }
 
 
+# Cache
+# Файловый кэш общий для процессов веб-сервера и воркера импорта,
+# поэтому смена версии после импорта сразу видна всем.
+# Версия расписания лежит в отдельном кэше: при переполнении default удаляет
+# случайную треть файлов, и версия не должна попасть под эту очистку
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'timetable_version': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache_version',
+        'TIMEOUT': None,
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -117,12 +138,57 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Загруженные файлы, кэш разбора и снимок расписания. Путь абсолютный: веб-сервер
+# и воркер импорта, запущенные из разных каталогов, видят одни и те же файлы
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = 'media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Импорт загруженных расписаний: при True файл разбирает воркер
+# `python manage.py run_import_worker`, а не запрос админки
+FILETIME_IMPORT_ASYNC = True
+FILETIME_IMPORT_POLL_INTERVAL = 2
+# Кэш результатов разбора в MEDIA_ROOT/parse_cache, 0 отключает кэш
+FILETIME_PARSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Точный пик памяти каждого импорта через tracemalloc; замедляет импорт в 3-4 раза,
+# без него в метриках пик RSS процесса
+FILETIME_IMPORT_TRACE_MEMORY = False
+# Чтение xlsx: 'openpyxl' или 'native' (свой потоковый разбор zip, в 2-3 раза быстрее)
+FILETIME_PARSER_ENGINE = 'openpyxl'
+# Снимок текущих недель для API (MEDIA_ROOT/timetable.snapshot): пишется после
+# импорта, процессы веб-сервера читают его через mmap без запросов к базе.
+# (недель до текущей, недель после); None отключает снимок
+FILETIME_SNAPSHOT_WEEKS = (1, 8)
+# Звонки для экспорта в календарь: номер пары -> (начало, конец);
+# пары без времени выгружаются событием на весь день
+FILETIME_LESSON_TIMES = {
+    1: ('08:30', '10:00'),
+    2: ('10:10', '11:40'),
+    3: ('12:10', '13:40'),
+    4: ('13:50', '15:20'),
+    5: ('15:30', '17:00'),
+    6: ('17:10', '18:40'),
+    7: ('18:50', '20:20'),
+}
+
+# Строка метрик на каждый импорт: logger filetime.import
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'filetime.import': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+
 try:
     from shifttime.local_settings import *
 except ImportError: